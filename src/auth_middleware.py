@@ -5,20 +5,65 @@ Professional authentication implementation with multiple auth methods
 """
 
 import os
+import sys
 import jwt
 import time
 import yaml
-import boto3
+import base64
 import hashlib
 import secrets
-from typing import Dict, Optional, Tuple, Any
-from functools import wraps
-from flask import Flask, request, jsonify, g
-from datetime import datetime, timedelta
+import ipaddress
+import threading
+from collections import deque
+from typing import Dict, List, Optional, Tuple, Any
+from functools import wraps, lru_cache
+from cachetools import LRUCache, TTLCache
+from flask import Flask, request, jsonify, g, current_app
+from datetime import datetime, timezone
 import logging
+import orjson
+
+try:
+    from blake3 import blake3
+except ImportError:  # blake3 is optional; BLAKE2b from hashlib is used instead
+    blake3 = None
 
 logger = logging.getLogger(__name__)
 
+# Sliding-log rate limit evaluated atomically in Redis:
+# KEYS[1]=client key, ARGV = window_start_ms, max_requests, now_ms, window_seconds, member
+RATE_LIMIT_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, ARGV[1])
+local count = redis.call('ZCARD', KEYS[1])
+if count >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[3], ARGV[5])
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+return 1
+"""
+
+if blake3 is not None:
+    def _keyed_digest(data: bytes, key: bytes) -> bytes:
+        """16-byte keyed digest using SIMD-accelerated BLAKE3 (key must be 32 bytes)"""
+        return blake3(data, key=key).digest(length=16)
+else:
+    def _keyed_digest(data: bytes, key: bytes) -> bytes:
+        """16-byte keyed digest using BLAKE2b"""
+        return hashlib.blake2b(data, digest_size=16, key=key).digest()
+
+# Prefer libyaml's C parser when available
+YamlLoader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+
+@lru_cache(maxsize=8)
+def _parse_yaml(path: str, mtime: float) -> Dict[str, Any]:
+    """Parse a YAML file, memoized on (path, mtime) so edits invalidate the cache.
+    
+    The returned dict is shared between callers and must not be mutated.
+    """
+    with open(path, 'r') as f:
+        return yaml.load(f, Loader=YamlLoader)
+
 class AuthenticationError(Exception):
     """Custom authentication exception"""
     pass
@@ -29,20 +74,85 @@ class AuthMiddleware:
     def __init__(self, config_path: str = "/app/config/auth/auth-config-deployment.yml"):
         self.config = self._load_config(config_path)
         self.auth_method = self.config['authentication']['method']
-        self.tokens = {}  # In-memory token store (use Redis in production)
-        self.rate_limits = {}  # Rate limiting store
         
-        # Initialize AWS clients if needed
+        # In-memory token store (use Redis in production); expired entries are evicted by the cache
+        token_config = self.config['authentication'].get('api_token', {})
+        self.tokens = TTLCache(
+            maxsize=token_config.get('max_tokens', 10000),
+            ttl=token_config.get('expiration_hours', 24) * 3600
+        )
+        # Recently rejected token digests; bounded so probes cannot grow it past maxsize
+        self._bad_tokens = TTLCache(maxsize=4096, ttl=60)
+        # The token, bad-token, trusted-client and IAM caches are shared by Flask's request
+        # threads and cachetools caches are not thread-safe, so every access holds this lock
+        self._cache_lock = threading.Lock()
+        
+        # Rate limiting settings are read once; check_rate_limit runs on every request
+        rate_config = self.config['security']['rate_limiting']
+        # Rate limiting store, bounded so one-off clients (e.g. LB probes) cannot grow it forever
+        self.rate_limits = LRUCache(maxsize=rate_config.get('max_clients', 100000))
+        # Flask may serve requests from several threads and LRUCache is not thread-safe
+        self._rate_lock = threading.Lock()
+        self._rate_enabled = rate_config.get('enabled', False)
+        self._rate_window_s = rate_config.get('window_minutes', 1) * 60
+        self._rate_window_ms = int(self._rate_window_s * 1000)
+        self._rate_max = rate_config.get('max_requests', 60)
+        self._rate_algorithm = rate_config.get('algorithm', 'sliding_counter')
+        self._rate_limit_error = (
+            f"Rate limit exceeded: {self._rate_max} requests per {rate_config.get('window_minutes', 1)} minutes"
+        )
+        self._trust_proxy_headers = rate_config.get('trust_proxy_headers', False)
+        # Internal callers (LB health checks, intra-VPC traffic) bypass rate limiting
+        self._trusted_networks = tuple(
+            ipaddress.ip_network(cidr, strict=False) for cidr in rate_config.get('trusted_cidrs', [])
+        )
+        self._trusted_clients = LRUCache(maxsize=4096)  # Per-address verdict cache
+        
+        # Key for hashing tokens (32 bytes); must be shared by all workers when tokens live in Redis,
+        # and those workers must agree on whether blake3 is installed
+        hash_secret = os.getenv('AUTH_TOKEN_KEY', token_config.get('hash_key', ''))
+        self._token_hash_key = (
+            hashlib.sha256(hash_secret.encode()).digest() if hash_secret else secrets.token_bytes(32)
+        )
+        
+        # Shared Redis store for tokens and rate limits across workers (optional)
+        self.redis = None
+        redis_url = os.getenv('REDIS_URL', self.config.get('storage', {}).get('redis_url'))
+        if redis_url:
+            import redis
+            self.redis = redis.Redis.from_url(redis_url)
+            self._rate_limit_script = self.redis.register_script(RATE_LIMIT_SCRIPT)
+            if not hash_secret:
+                logger.warning("AUTH_TOKEN_KEY not set - tokens stored in Redis are only valid for this worker")
+        
+        # Resolve the authentication handler and header prefix once
+        self._authenticate = {
+            'none': self._auth_none,
+            'api_token': self._auth_api_token,
+            'iam_role': self._auth_iam_role,
+            'mtls': self._auth_mtls
+        }.get(self.auth_method, self._auth_unknown)
+        self._token_prefix = f"{token_config.get('token_prefix', 'Bearer')} "
+        
+        # Initialize AWS clients if needed (boto3 is imported lazily; it is slow to import)
         if self.auth_method == 'iam_role':
+            import boto3
+            from botocore.config import Config as BotoConfig
             self.sts_client = boto3.client('sts')
+            iam_config = self.config['authentication']['iam_role']
+            self._expected_role = iam_config['role_arn']
+            # Successful caller-identity checks, keyed by credential digest
+            self._iam_cache = TTLCache(maxsize=1024, ttl=iam_config.get('cache_ttl', 120))
+            # STS clients per credential set, so sessions are not rebuilt on every cache miss
+            self._sts_clients = LRUCache(maxsize=256)
+            self._sts_client_config = BotoConfig(max_pool_connections=64, retries={'max_attempts': 1})
             
         logger.info(f"Authentication middleware initialized with method: {self.auth_method}")
     
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load authentication configuration"""
         try:
-            with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+            config = _parse_yaml(config_path, os.path.getmtime(config_path))
             
             # Apply environment-specific overrides
             env = os.getenv('ENVIRONMENT', 'development')
@@ -60,72 +170,120 @@ class AuthMiddleware:
             }
     
     def _merge_config(self, base: Dict, override: Dict) -> Dict:
-        """Merge configuration dictionaries"""
+        """Merge configuration dictionaries
+        
+        Works iteratively and only copies the dicts along overridden paths, so the
+        (cached, shared) base config is never mutated.
+        """
         result = base.copy()
-        for key, value in override.items():
-            if isinstance(value, dict) and key in result:
-                result[key] = self._merge_config(result[key], value)
-            else:
-                result[key] = value
+        pending = [(result, override)]
+        while pending:
+            target, patch = pending.pop()
+            for key, value in patch.items():
+                current = target.get(key)
+                if isinstance(value, dict) and isinstance(current, dict):
+                    target[key] = current.copy()
+                    pending.append((target[key], value))
+                else:
+                    target[key] = value
         return result
     
+    def _hash_secret(self, value: str) -> bytes:
+        """Derive a keyed digest so raw tokens and credentials are never kept in memory"""
+        return _keyed_digest(value.encode(), self._token_hash_key)
+    
     def generate_api_token(self, user_id: str = "deployer-ddf-mod-llm-models") -> str:
         """Generate a new API token"""
+        return self.generate_api_tokens(1, user_id)[0]
+    
+    def generate_api_tokens(self, count: int, user_id: str = "deployer-ddf-mod-llm-models") -> List[str]:
+        """Generate several API tokens from a single read of the system CSPRNG"""
         token_config = self.config['authentication']['api_token']
+        token_length = token_config['token_length']
+        ttl_seconds = token_config['expiration_hours'] * 3600
         
-        # Generate secure random token
-        token = secrets.token_urlsafe(token_config['token_length'])
+        # Generate secure random tokens (equivalent to secrets.token_urlsafe per token)
+        entropy = secrets.token_bytes(count * token_length)
+        tokens = [
+            base64.urlsafe_b64encode(entropy[i:i + token_length]).rstrip(b'=').decode('ascii')
+            for i in range(0, len(entropy), token_length)
+        ]
         
-        # Store token with expiration
-        expiration = datetime.utcnow() + timedelta(hours=token_config['expiration_hours'])
-        self.tokens[token] = {
-            'user_id': user_id,
-            'created_at': datetime.utcnow(),
-            'expires_at': expiration,
-            'requests_count': 0
-        }
+        # Store tokens; expiration is handled by the TTL cache (or Redis key expiry)
+        if self.redis:
+            with self.redis.pipeline(transaction=False) as pipe:
+                for token in tokens:
+                    pipe.setex(f"token:{self._hash_secret(token).hex()}", ttl_seconds, user_id)
+                pipe.execute()
+        else:
+            keys = [self._hash_secret(token) for token in tokens]
+            with self._cache_lock:
+                for key in keys:
+                    self.tokens[key] = {
+                        'user_id': user_id,
+                        'requests_count': 0
+                    }
         
-        logger.info(f"Generated new API token for user: {user_id}")
-        return token
+        logger.info(f"Generated {count} new API token(s) for user: {user_id}")
+        return tokens
     
-    def validate_api_token(self, token: str) -> Tuple[bool, Optional[str]]:
+    def validate_api_token(self, token: str) -> Tuple[bool, Optional[str], Optional[Dict]]:
         """Validate API token"""
-        if token not in self.tokens:
-            return False, "Invalid token"
+        key = self._hash_secret(token)
         
-        token_data = self.tokens[token]
+        # Repeated probes with a known-bad token stop here (brute-force scans)
+        with self._cache_lock:
+            if key in self._bad_tokens:
+                return False, "Invalid or expired token", None
         
-        # Check expiration
-        if datetime.utcnow() > token_data['expires_at']:
-            del self.tokens[token]
-            return False, "Token expired"
+        if self.redis:
+            user_id = self.redis.get(f"token:{key.hex()}")
+            token_data = {'user_id': user_id.decode()} if user_id is not None else None
+        else:
+            with self._cache_lock:
+                token_data = self.tokens.get(key)
+                if token_data is not None:
+                    # Update usage count
+                    token_data['requests_count'] += 1
         
-        # Update usage count
-        token_data['requests_count'] += 1
+        if token_data is None:
+            with self._cache_lock:
+                self._bad_tokens[key] = True
+            return False, "Invalid or expired token", None
         
-        return True, None
+        return True, None, token_data
     
     def validate_iam_role(self, aws_access_key: str, aws_secret_key: str, aws_session_token: str = None) -> Tuple[bool, Optional[str]]:
         """Validate AWS IAM role authentication"""
+        cache_key = self._hash_secret(f"{aws_access_key}:{aws_secret_key}:{aws_session_token or ''}")
+        with self._cache_lock:
+            if cache_key in self._iam_cache:
+                return True, None
+            sts = self._sts_clients.get(cache_key)
+        
         try:
-            # Create temporary credentials
-            session = boto3.Session(
-                aws_access_key_id=aws_access_key,
-                aws_secret_access_key=aws_secret_key,
-                aws_session_token=aws_session_token
-            )
-            
-            sts = session.client('sts')
+            if sts is None:
+                import boto3
+                # Create temporary credentials
+                session = boto3.Session(
+                    aws_access_key_id=aws_access_key,
+                    aws_secret_access_key=aws_secret_key,
+                    aws_session_token=aws_session_token
+                )
+                sts = session.client('sts', config=self._sts_client_config)
+                with self._cache_lock:
+                    self._sts_clients[cache_key] = sts
             
             # Verify credentials by getting caller identity
             response = sts.get_caller_identity()
             
             # Check if the role ARN matches expected pattern
             arn = response.get('Arn', '')
-            expected_role = self.config['authentication']['iam_role']['role_arn']
-            
-            if 'deployer-ddf-mod-llm-models' in arn or arn == expected_role:
+            if 'deployer-ddf-mod-llm-models' in arn or arn == self._expected_role:
                 logger.info(f"IAM authentication successful for ARN: {arn}")
+                # Only successes are cached so revoked credentials fail on the next miss
+                with self._cache_lock:
+                    self._iam_cache[cache_key] = arn
                 return True, None
             else:
                 return False, f"Unauthorized role: {arn}"
@@ -135,88 +293,181 @@ class AuthMiddleware:
             return False, f"IAM authentication error: {str(e)}"
     
     def check_rate_limit(self, client_id: str) -> Tuple[bool, Optional[str]]:
-        """Check rate limiting"""
-        if not self.config['security']['rate_limiting']['enabled']:
+        """Check rate limiting (sliding-window counter by default)"""
+        if not self._rate_enabled:
+            return True, None
+        if self._trusted_networks and self._is_trusted_client(client_id):
             return True, None
         
-        rate_config = self.config['security']['rate_limiting']
-        window_minutes = rate_config['window_minutes']
-        max_requests = rate_config['max_requests']
-        
-        now = datetime.utcnow()
-        window_start = now - timedelta(minutes=window_minutes)
+        if self.redis:
+            return self._check_rate_limit_redis(client_id)
+        if self._rate_algorithm == 'sliding_log':
+            return self._check_rate_limit_log(client_id)
         
-        # Clean old entries
-        if client_id in self.rate_limits:
-            self.rate_limits[client_id] = [
-                req_time for req_time in self.rate_limits[client_id]
-                if req_time > window_start
+        window = self._rate_window_s
+        with self._rate_lock:
+            now = time.monotonic()
+            prev_count, curr_count, window_start = self.rate_limits.get(client_id, (0, 0, now))
+            
+            # Roll the window forward, dropping the previous bucket if it is too old
+            elapsed = now - window_start
+            if elapsed >= 2 * window:
+                prev_count, curr_count, window_start, elapsed = 0, 0, now, 0.0
+            elif elapsed >= window:
+                prev_count, curr_count = curr_count, 0
+                window_start += window
+                elapsed -= window
+            
+            # Weight the previous bucket by how much of it still overlaps the window
+            estimated = prev_count * (1 - elapsed / window) + curr_count
+            if estimated >= self._rate_max:
+                self.rate_limits[client_id] = (prev_count, curr_count, window_start)
+                return False, self._rate_limit_error
+            
+            # Count current request
+            self.rate_limits[client_id] = (prev_count, curr_count + 1, window_start)
+            return True, None
+    
+    def _is_trusted_client(self, client_id: str) -> bool:
+        """Check whether a client address falls inside one of the trusted CIDRs"""
+        with self._cache_lock:
+            trusted = self._trusted_clients.get(client_id)
+        if trusted is None:
+            try:
+                address = ipaddress.ip_address(client_id)
+                trusted = any(address in network for network in self._trusted_networks)
+            except ValueError:
+                trusted = False
+            with self._cache_lock:
+                self._trusted_clients[client_id] = trusted
+        return trusted
+    
+    def _check_rate_limit_log(self, client_id: str) -> Tuple[bool, Optional[str]]:
+        """Check rate limiting with an exact sliding log of request timestamps"""
+        with self._rate_lock:
+            now = time.monotonic()
+            cutoff = now - self._rate_window_s
+            
+            timestamps = self.rate_limits.get(client_id)
+            if timestamps is None:
+                timestamps = self.rate_limits[client_id] = deque()
+            
+            # Timestamps are appended in order: drop everything at once for idle clients,
+            # otherwise evict expired entries from the left
+            if timestamps and timestamps[-1] <= cutoff:
+                timestamps.clear()
+            else:
+                while timestamps and timestamps[0] <= cutoff:
+                    timestamps.popleft()
+            
+            if len(timestamps) >= self._rate_max:
+                return False, self._rate_limit_error
+            
+            timestamps.append(now)
+            return True, None
+    
+    def _check_rate_limit_redis(self, client_id: str) -> Tuple[bool, Optional[str]]:
+        """Check rate limiting against the shared Redis sliding log in a single round-trip"""
+        # Wall-clock time here: the log is shared by workers that do not share a monotonic clock
+        now_ms = int(time.time() * 1000)
+        allowed = self._rate_limit_script(
+            keys=[f"rl:{client_id}"],
+            args=[
+                now_ms - self._rate_window_ms, self._rate_max, now_ms,
+                self._rate_window_ms // 1000 + 1, f"{now_ms}-{secrets.token_hex(4)}"
             ]
-        else:
-            self.rate_limits[client_id] = []
-        
-        # Check limit
-        if len(self.rate_limits[client_id]) >= max_requests:
-            return False, f"Rate limit exceeded: {max_requests} requests per {window_minutes} minutes"
-        
-        # Add current request
-        self.rate_limits[client_id].append(now)
+        )
+        if not allowed:
+            return False, self._rate_limit_error
         return True, None
     
     def authenticate_request(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
         """Main authentication method"""
-        client_id = request.remote_addr
+        # Only honour X-Forwarded-For when deployed behind a trusted proxy; otherwise it is spoofable
+        if self._trust_proxy_headers:
+            route = request.access_route
+            client_id = route[0] if route else ''
+        else:
+            client_id = request.remote_addr or ''
+        # Interned so repeat clients hit the rate-limit store via pointer comparison
+        client_id = sys.intern(client_id)
         
         # Check rate limiting first
         rate_ok, rate_error = self.check_rate_limit(client_id)
         if not rate_ok:
             return False, rate_error, None
         
-        # Skip authentication if method is 'none'
-        if self.auth_method == 'none':
-            logger.warning("No authentication enabled - development mode")
-            return True, None, {'user_id': 'anonymous', 'method': 'none'}
+        return self._authenticate()
+    
+    def _auth_none(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """Skip authentication (development mode)"""
+        logger.warning("No authentication enabled - development mode")
+        return True, None, {'user_id': 'anonymous', 'method': 'none'}
+    
+    def _auth_api_token(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """API Token authentication"""
+        # Read straight from the WSGI environ to skip the case-insensitive header lookup
+        auth_header = request.environ.get('HTTP_AUTHORIZATION', '')
         
-        # API Token authentication
-        elif self.auth_method == 'api_token':
-            auth_header = request.headers.get('Authorization', '')
-            token_config = self.config['authentication']['api_token']
-            
-            if not auth_header.startswith(f"{token_config['token_prefix']} "):
-                return False, "Missing or invalid Authorization header", None
-            
-            token = auth_header.split(' ', 1)[1]
-            valid, error = self.validate_api_token(token)
-            
-            if valid:
-                return True, None, {'user_id': self.tokens[token]['user_id'], 'method': 'api_token'}
-            else:
-                return False, error, None
+        token = auth_header.removeprefix(self._token_prefix)
+        if len(token) == len(auth_header):
+            return False, "Missing or invalid Authorization header", None
         
-        # AWS IAM Role authentication
-        elif self.auth_method == 'iam_role':
-            aws_access_key = request.headers.get('X-AWS-Access-Key-Id')
-            aws_secret_key = request.headers.get('X-AWS-Secret-Access-Key')
-            aws_session_token = request.headers.get('X-AWS-Session-Token')
-            
-            if not aws_access_key or not aws_secret_key:
-                return False, "Missing AWS credentials in headers", None
-            
-            valid, error = self.validate_iam_role(aws_access_key, aws_secret_key, aws_session_token)
-            
-            if valid:
-                return True, None, {'user_id': 'aws-role', 'method': 'iam_role'}
-            else:
-                return False, error, None
+        valid, error, token_data = self.validate_api_token(token)
+        
+        if valid:
+            return True, None, {'user_id': token_data['user_id'], 'method': 'api_token'}
+        else:
+            return False, error, None
+    
+    def _auth_iam_role(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """AWS IAM Role authentication"""
+        aws_access_key = request.headers.get('X-AWS-Access-Key-Id')
+        aws_secret_key = request.headers.get('X-AWS-Secret-Access-Key')
+        aws_session_token = request.headers.get('X-AWS-Session-Token')
+        
+        if not aws_access_key or not aws_secret_key:
+            return False, "Missing AWS credentials in headers", None
         
-        # mTLS authentication (placeholder - requires SSL context)
-        elif self.auth_method == 'mtls':
-            # This would require SSL context and client certificate validation
-            # Implementation depends on the web server (nginx, Apache, etc.)
-            return False, "mTLS authentication not implemented in this context", None
+        valid, error = self.validate_iam_role(aws_access_key, aws_secret_key, aws_session_token)
         
+        if valid:
+            return True, None, {'user_id': 'aws-role', 'method': 'iam_role'}
         else:
-            return False, f"Unknown authentication method: {self.auth_method}", None
+            return False, error, None
+    
+    def _auth_mtls(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """mTLS authentication (placeholder - requires SSL context)"""
+        # This would require SSL context and client certificate validation
+        # Implementation depends on the web server (nginx, Apache, etc.)
+        return False, "mTLS authentication not implemented in this context", None
+    
+    def _auth_unknown(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
+        """Reject requests when the configured method is not supported"""
+        return False, f"Unknown authentication method: {self.auth_method}", None
+
+def json_response(payload: Dict[str, Any], status: int = 200):
+    """Serialize a JSON response with orjson (datetimes are encoded in C as UTC ISO-8601)"""
+    return current_app.response_class(
+        orjson.dumps(payload, option=orjson.OPT_UTC_Z),
+        status=status,
+        mimetype='application/json'
+    )
+
+# Static parts of the 401 body, serialized once; only message and timestamp vary
+AUTH_ERROR_HEAD = b'{"error":"Authentication failed","message":'
+AUTH_ERROR_MID = b',"timestamp":'
+
+def auth_error_response(error: Optional[str]):
+    """Build the 401 response by splicing the dynamic fields into the pre-serialized body"""
+    body = b''.join((
+        AUTH_ERROR_HEAD,
+        orjson.dumps(error),
+        AUTH_ERROR_MID,
+        orjson.dumps(datetime.now(timezone.utc), option=orjson.OPT_UTC_Z),
+        b'}'
+    ))
+    return current_app.response_class(body, status=401, mimetype='application/json')
 
 def create_auth_decorator(auth_middleware: AuthMiddleware):
     """Create authentication decorator"""
@@ -227,11 +478,7 @@ def create_auth_decorator(auth_middleware: AuthMiddleware):
             
             if not authenticated:
                 logger.warning(f"Authentication failed: {error}")
-                return jsonify({
-                    'error': 'Authentication failed',
-                    'message': error,
-                    'timestamp': datetime.utcnow().isoformat()
-                }), 401
+                return auth_error_response(error)
             
             # Store user info in Flask's g object
             g.user = user_info
@@ -271,11 +518,11 @@ def setup_auth_middleware(app: Flask, config_path: str = None) -> AuthMiddleware
     @app.route('/auth/status', methods=['GET'])
     @require_auth
     def auth_status():
-        return jsonify({
+        return json_response({
             'authenticated': True,
             'user': g.user,
             'method': auth.auth_method,
-            'timestamp': datetime.utcnow().isoformat()
+            'timestamp': datetime.now(timezone.utc)
         })
     
     logger.info("Authentication middleware setup complete")
@@ -4,20 +4,64 @@ Manages parallel test execution across multiple AWS instances
 """
 
 import asyncio
+import gzip
 import json
 import logging
 import time
-from typing import List, Dict, Any, Optional
-from dataclasses import dataclass, asdict
-from datetime import datetime, timezone
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
+from typing import List, Dict, Any, Optional, Set, Tuple, Callable
+from dataclasses import dataclass, field
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import AsyncExitStack
+from datetime import datetime, timedelta, timezone
+import orjson
+from cachetools import TTLCache
+from aiobotocore.config import AioConfig
+from aiobotocore.session import get_session
+from botocore.exceptions import BotoCoreError, ClientError, NoCredentialsError
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-@dataclass
+METRIC_NAMESPACE = 'AI-Testing-Agent/Distributed'
+COORDINATOR_VERSION = '1.0.0'
+SQS_BATCH_SIZE = 10  # SendMessageBatch/DeleteMessageBatch limit
+METRIC_BATCH_SIZE = 900  # PutMetricData accepts up to 1000 entries per call
+METRIC_FLUSH_INTERVAL_SECONDS = 1.0
+DELETE_FLUSH_INTERVAL_SECONDS = 0.2
+MAX_POLL_WAIT_SECONDS = 20  # SQS long-poll maximum
+EMPTY_POLLS_BEFORE_MAX_WAIT = 3
+QUEUE_STATS_ATTRIBUTES = [
+    'ApproximateNumberOfMessages',
+    'ApproximateNumberOfMessagesNotVisible',
+    'ApproximateNumberOfMessagesDelayed'
+]
+JOB_CACHE_SIZE = 10_000
+QUEUE_STATS_TTL_SECONDS = 2.0  # GetQueueAttributes counts are approximate anyway
+COMPLETED_JOB_TTL_SECONDS = 3600
+ACTIVE_JOB_TTL_SECONDS = 12 * 3600  # SQS maximum visibility timeout; older jobs were lost
+RETRY_BASE_DELAY_SECONDS = 10
+RETRY_MAX_DELAY_SECONDS = 900
+RESULT_COMPRESSION_LEVEL = 3  # Good ratio on generated test code at a fraction of level 9's CPU
+CPU_POOL_WORKERS = 4
+
+# SQS MessageAttributes data types and small-int strings, shared by every submitted job
+NUMBER_ATTRIBUTE = 'Number'
+STRING_ATTRIBUTE = 'String'
+_INT_STRINGS = [str(i) for i in range(256)]
+
+# (10ms monotonic bucket, ISO timestamp) reused by every caller within the same bucket
+_utc_now_iso_cache: Tuple[int, str] = (-1, '')
+
+def utc_now_iso() -> str:
+    """Current UTC time in ISO format, formatted at most once per 10ms"""
+    global _utc_now_iso_cache
+    bucket = int(time.monotonic() * 100)
+    if _utc_now_iso_cache[0] != bucket:
+        _utc_now_iso_cache = (bucket, datetime.now(timezone.utc).isoformat())
+    return _utc_now_iso_cache[1]
+
+@dataclass(slots=True)
 class TestJob:
     """Represents a test job to be processed"""
     id: str
@@ -28,12 +72,60 @@ class TestJob:
     retry_count: int = 0
     max_retries: int = 3
     created_at: str = None
+    _message_body: Optional[Tuple[int, str]] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.created_at is None:
-            self.created_at = datetime.now(timezone.utc).isoformat()
+            self.created_at = utc_now_iso()
+    
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any]) -> 'TestJob':
+        """Build a job from a decoded message body, skipping __init__/__post_init__"""
+        job = cls.__new__(cls)
+        job.id = data['id']
+        job.code = data['code']
+        job.language = data['language']
+        job.test_type = data.get('test_type', 'unit')
+        job.priority = data.get('priority', 1)
+        job.retry_count = data.get('retry_count', 0)
+        job.max_retries = data.get('max_retries', 3)
+        job.created_at = data.get('created_at') or utc_now_iso()
+        job._message_body = None
+        return job
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of the job fields (faster than dataclasses.asdict)"""
+        return {
+            'id': self.id,
+            'code': self.code,
+            'language': self.language,
+            'test_type': self.test_type,
+            'priority': self.priority,
+            'retry_count': self.retry_count,
+            'max_retries': self.max_retries,
+            'created_at': self.created_at
+        }
+    
+    def message_attributes(self) -> Dict[str, Dict[str, str]]:
+        """SQS MessageAttributes used for routing and filtering"""
+        priority = self.priority
+        return {
+            'Priority': {
+                'StringValue': _INT_STRINGS[priority] if 0 <= priority < 256 else str(priority),
+                'DataType': NUMBER_ATTRIBUTE
+            },
+            'Language': {'StringValue': self.language, 'DataType': STRING_ATTRIBUTE},
+            'TestType': {'StringValue': self.test_type, 'DataType': STRING_ATTRIBUTE}
+        }
+    
+    def message_body(self) -> str:
+        """JSON body for SQS, serialized once per retry attempt"""
+        cached = self._message_body
+        if cached is None or cached[0] != self.retry_count:
+            cached = self._message_body = (self.retry_count, orjson.dumps(self.to_dict()).decode())
+        return cached[1]
 
-@dataclass
+@dataclass(slots=True)
 class TestResult:
     """Represents the result of a test job"""
     job_id: str
@@ -49,7 +141,66 @@ class TestResult:
     
     def __post_init__(self):
         if self.completed_at is None:
-            self.completed_at = datetime.now(timezone.utc).isoformat()
+            self.completed_at = utc_now_iso()
+    
+    @classmethod
+    def from_wire(cls, data: Dict[str, Any]) -> 'TestResult':
+        """Build a result from a decoded stored document, skipping __init__/__post_init__"""
+        result = cls.__new__(cls)
+        result.job_id = data['job_id']
+        result.success = data['success']
+        result.tests_generated = data['tests_generated']
+        result.tests_passed = data['tests_passed']
+        result.tests_failed = data['tests_failed']
+        result.coverage_percentage = data['coverage_percentage']
+        result.execution_time_ms = data['execution_time_ms']
+        result.error_message = data.get('error_message')
+        result.generated_tests = data.get('generated_tests')
+        result.completed_at = data.get('completed_at') or utc_now_iso()
+        return result
+    
+    @classmethod
+    def failure(cls, job_id: str, error_message: str) -> 'TestResult':
+        """Build a failed result with no tests, skipping __init__/__post_init__"""
+        result = cls.__new__(cls)
+        result.job_id = job_id
+        result.success = False
+        result.tests_generated = 0
+        result.tests_passed = 0
+        result.tests_failed = 0
+        result.coverage_percentage = 0.0
+        result.execution_time_ms = 0
+        result.error_message = error_message
+        result.generated_tests = None
+        result.completed_at = utc_now_iso()
+        return result
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of the result fields (faster than dataclasses.asdict)"""
+        return {
+            'job_id': self.job_id,
+            'success': self.success,
+            'tests_generated': self.tests_generated,
+            'tests_passed': self.tests_passed,
+            'tests_failed': self.tests_failed,
+            'coverage_percentage': self.coverage_percentage,
+            'execution_time_ms': self.execution_time_ms,
+            'error_message': self.error_message,
+            'generated_tests': self.generated_tests,
+            'completed_at': self.completed_at
+        }
+
+def _parse_job(body: str) -> TestJob:
+    """Decode an SQS message body into a TestJob (runs on the CPU pool)"""
+    return TestJob.from_wire(orjson.loads(body))
+
+def _decode_result(raw: bytes) -> TestResult:
+    """Decompress and decode a stored result document"""
+    return TestResult.from_wire(orjson.loads(gzip.decompress(raw))['result'])
+
+def _encode_result(result_data: Dict[str, Any]) -> bytes:
+    """Serialize and gzip a stored result document (runs on the CPU pool)"""
+    return gzip.compress(orjson.dumps(result_data), compresslevel=RESULT_COMPRESSION_LEVEL)
 
 class DistributedTestCoordinator:
     """Coordinates distributed test execution across AWS instances"""
@@ -58,7 +209,8 @@ class DistributedTestCoordinator:
                  queue_url: str, 
                  result_bucket: str, 
                  region: str = 'us-east-1',
-                 max_concurrent_jobs: int = 10):
+                 max_concurrent_jobs: int = 10,
+                 poll_wait_seconds: int = MAX_POLL_WAIT_SECONDS):
         """
         Initialize the distributed test coordinator
         
@@ -67,27 +219,119 @@ class DistributedTestCoordinator:
             result_bucket: S3 bucket for storing test results
             region: AWS region
             max_concurrent_jobs: Maximum concurrent jobs per instance
+            poll_wait_seconds: SQS long-poll wait while messages are flowing
         """
         self.queue_url = queue_url
         self.result_bucket = result_bucket
         self.region = region
         self.max_concurrent_jobs = max_concurrent_jobs
+        self.poll_wait_seconds = min(poll_wait_seconds, MAX_POLL_WAIT_SECONDS)
         
-        # Initialize AWS clients
-        try:
-            self.sqs = boto3.client('sqs', region_name=region)
-            self.s3 = boto3.client('s3', region_name=region)
-            self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        except NoCredentialsError:
-            logger.error("AWS credentials not found. Please configure AWS CLI.")
-            raise
+        # receive_message arguments, built once; WaitTimeSeconds is raised while the queue is idle
+        self._recv_kwargs = {
+            'QueueUrl': queue_url,
+            'MaxNumberOfMessages': SQS_BATCH_SIZE,
+            'WaitTimeSeconds': self.poll_wait_seconds,
+            'MessageAttributeNames': ['All'],
+            'AttributeNames': ['ApproximateReceiveCount']
+        }
+        self._empty_polls = 0
+        
+        # AWS clients are async (aiobotocore) and created on first use inside the event loop
+        self._session = get_session()
+        # The default pool of 10 connections would cap SQS/S3/CloudWatch fan-out below max_concurrent_jobs
+        self._client_config = AioConfig(
+            max_pool_connections=max(50, max_concurrent_jobs * 3),
+            retries={'max_attempts': 3, 'mode': 'adaptive'},
+            tcp_keepalive=True
+        )
+        self._client_stack: Optional[AsyncExitStack] = None
+        self._clients_lock = asyncio.Lock()
+        self.sqs = None
+        self.s3 = None
+        self.cloudwatch = None
+        
+        # Plain boto3 clients for the synchronous status helpers, so quick CLI checks skip the event loop
+        self._sync_clients: Dict[str, Any] = {}
+        
+        # Metrics are buffered and sent to CloudWatch in batches by a background task
+        self._metric_buffer: List[Dict[str, Any]] = []
+        
+        # Receipt handles of finished messages, deleted from SQS in batches of 10
+        self._delete_buffer: List[str] = []
+        self._flush_tasks: List[asyncio.Task] = []
+        
+        # Per-message parsing and result encoding run here so they don't stall the event loop
+        self._cpu_pool: Optional[ThreadPoolExecutor] = None
         
-        # Job tracking
-        self.active_jobs: Dict[str, TestJob] = {}
-        self.completed_jobs: Dict[str, TestResult] = {}
+        # Job tracking, bounded so a long-running coordinator does not grow without limit
+        self.active_jobs: Dict[str, TestJob] = TTLCache(JOB_CACHE_SIZE, ACTIVE_JOB_TTL_SECONDS)
+        self.completed_jobs: Dict[str, TestResult] = TTLCache(JOB_CACHE_SIZE, COMPLETED_JOB_TTL_SECONDS)
+        
+        # Status responses built once per state change, so get_job_status does no serialization
+        self.active_job_dicts: Dict[str, Dict[str, Any]] = TTLCache(JOB_CACHE_SIZE, ACTIVE_JOB_TTL_SECONDS)
+        self.completed_result_dicts: Dict[str, Dict[str, Any]] = TTLCache(JOB_CACHE_SIZE, COMPLETED_JOB_TTL_SECONDS)
+        
+        # Last get_queue_stats response as (monotonic time, stats); cleared when jobs are submitted
+        self._queue_stats_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+        
+        # Called with each TestResult as it is recorded, so waiters need not poll
+        self._completion_listeners: List[Callable[[TestResult], None]] = []
         
         logger.info(f"Initialized DistributedTestCoordinator for region {region}")
     
+    async def __aenter__(self) -> 'DistributedTestCoordinator':
+        await self._ensure_clients()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _ensure_clients(self):
+        """Create the async SQS, S3 and CloudWatch clients once per coordinator"""
+        if self.sqs is not None:
+            return
+        
+        async with self._clients_lock:
+            if self.sqs is not None:
+                return
+            
+            stack = AsyncExitStack()
+            try:
+                self.s3 = await stack.enter_async_context(
+                    self._session.create_client('s3', region_name=self.region, config=self._client_config))
+                self.cloudwatch = await stack.enter_async_context(
+                    self._session.create_client('cloudwatch', region_name=self.region, config=self._client_config))
+                self.sqs = await stack.enter_async_context(
+                    self._session.create_client('sqs', region_name=self.region, config=self._client_config))
+            except NoCredentialsError:
+                await stack.aclose()
+                logger.error("AWS credentials not found. Please configure AWS CLI.")
+                raise
+            
+            self._client_stack = stack
+            self._cpu_pool = ThreadPoolExecutor(max_workers=CPU_POOL_WORKERS, thread_name_prefix='coordinator-cpu')
+            self._flush_tasks = [
+                asyncio.create_task(self._periodic_flush(self._flush_metrics, METRIC_FLUSH_INTERVAL_SECONDS)),
+                asyncio.create_task(self._periodic_flush(self._flush_deletes, DELETE_FLUSH_INTERVAL_SECONDS))
+            ]
+    
+    async def close(self):
+        """Flush buffered deletes and metrics, then close the AWS clients and the CPU pool"""
+        for task in self._flush_tasks:
+            task.cancel()
+        await asyncio.gather(*self._flush_tasks, return_exceptions=True)
+        self._flush_tasks = []
+        
+        if self._client_stack is not None:
+            await self._flush_deletes()
+            await self._flush_metrics()
+            await self._client_stack.aclose()
+            self._client_stack = None
+            self.sqs = self.s3 = self.cloudwatch = None
+            self._cpu_pool.shutdown(wait=False)
+            self._cpu_pool = None
+    
     async def submit_test_job(self, job: TestJob) -> str:
         """
         Submit a test job to the distributed queue
@@ -98,30 +342,17 @@ class DistributedTestCoordinator:
         Returns:
             Message ID from SQS
         """
+        await self._ensure_clients()
+        
         try:
-            message_body = json.dumps(asdict(job))
-            
-            response = self.sqs.send_message(
+            response = await self.sqs.send_message(
                 QueueUrl=self.queue_url,
-                MessageBody=message_body,
-                MessageAttributes={
-                    'Priority': {
-                        'StringValue': str(job.priority),
-                        'DataType': 'Number'
-                    },
-                    'Language': {
-                        'StringValue': job.language,
-                        'DataType': 'String'
-                    },
-                    'TestType': {
-                        'StringValue': job.test_type,
-                        'DataType': 'String'
-                    }
-                }
+                MessageBody=job.message_body(),
+                MessageAttributes=job.message_attributes()
             )
             
             message_id = response['MessageId']
-            self.active_jobs[job.id] = job
+            self._track_active(job)
             
             logger.info(f"Submitted job {job.id} to queue with message ID {message_id}")
             
@@ -144,104 +375,143 @@ class DistributedTestCoordinator:
         Returns:
             List of message IDs
         """
-        message_ids = []
-        
-        # Process in batches of 10 (SQS limit)
-        batch_size = 10
-        for i in range(0, len(jobs), batch_size):
-            batch = jobs[i:i + batch_size]
-            
-            entries = []
-            for job in batch:
-                entries.append({
-                    'Id': job.id,
-                    'MessageBody': json.dumps(asdict(job)),
-                    'MessageAttributes': {
-                        'Priority': {
-                            'StringValue': str(job.priority),
-                            'DataType': 'Number'
-                        },
-                        'Language': {
-                            'StringValue': job.language,
-                            'DataType': 'String'
-                        }
-                    }
-                })
+        return list((await self.submit_test_jobs(jobs)).values())
+    
+    async def submit_test_jobs(self, jobs: List[TestJob]) -> Dict[str, str]:
+        """
+        Submit multiple test jobs with SendMessageBatch, 10 jobs per call
+        
+        Batches are sent concurrently, with at most max_concurrent_jobs
+        requests in flight; a slow batch does not hold back the others.
+        
+        Args:
+            jobs: List of TestJob instances
             
-            try:
-                response = self.sqs.send_message_batch(
-                    QueueUrl=self.queue_url,
-                    Entries=entries
-                )
-                
-                # Track successful submissions
-                for success in response.get('Successful', []):
-                    job_id = success['Id']
-                    message_id = success['MessageId']
-                    message_ids.append(message_id)
-                    
-                    # Find the job and add to active tracking
-                    job = next(j for j in batch if j.id == job_id)
-                    self.active_jobs[job_id] = job
-                
-                # Log failed submissions
-                for failure in response.get('Failed', []):
-                    logger.error(f"Failed to submit job {failure['Id']}: {failure['Message']}")
-                
-                logger.info(f"Submitted batch of {len(response.get('Successful', []))} jobs")
-                
-            except ClientError as e:
-                logger.error(f"Failed to submit job batch: {e}")
-                raise
+        Returns:
+            Message IDs keyed by job ID; jobs rejected by SQS are missing
+        """
+        await self._ensure_clients()
+        message_ids: Dict[str, str] = {}
+        in_flight: Set[asyncio.Task] = set()
+        
+        try:
+            # Process in batches of 10 (SQS limit)
+            for i in range(0, len(jobs), SQS_BATCH_SIZE):
+                if len(in_flight) >= self.max_concurrent_jobs:
+                    done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                    for task in done:
+                        message_ids.update(task.result())
+                in_flight.add(asyncio.create_task(self._submit_batch(jobs[i:i + SQS_BATCH_SIZE])))
+            
+            for batch_ids in await asyncio.gather(*in_flight):
+                message_ids.update(batch_ids)
+        finally:
+            # Only left pending if a batch failed
+            for task in in_flight:
+                task.cancel()
         
         await self._send_metric('BatchJobsSubmitted', len(message_ids))
         return message_ids
     
+    async def _submit_batch(self, batch: List[TestJob]) -> Dict[str, str]:
+        """
+        Send one SQS batch of up to 10 jobs
+        
+        Args:
+            batch: TestJob instances for a single SendMessageBatch call
+            
+        Returns:
+            Message IDs of the jobs accepted by SQS, keyed by job ID
+        """
+        batch_by_id = {job.id: job for job in batch}
+        entries = [{
+            'Id': job.id,
+            'MessageBody': job.message_body(),
+            'MessageAttributes': job.message_attributes()
+        } for job in batch]
+        
+        try:
+            response = await self.sqs.send_message_batch(
+                QueueUrl=self.queue_url,
+                Entries=entries
+            )
+        except ClientError as e:
+            logger.error(f"Failed to submit job batch: {e}")
+            raise
+        
+        # Track successful submissions
+        message_ids = {}
+        for success in response.get('Successful', []):
+            job_id = success['Id']
+            message_ids[job_id] = success['MessageId']
+            
+            # Add the job to active tracking
+            self._track_active(batch_by_id[job_id])
+        
+        # Log failed submissions
+        for failure in response.get('Failed', []):
+            logger.error(f"Failed to submit job {failure['Id']}: {failure['Message']}")
+        
+        logger.info(f"Submitted batch of {len(message_ids)} jobs")
+        return message_ids
+    
     async def process_test_jobs(self, max_concurrent: int = None):
         """
         Process test jobs from the queue with concurrency control
         
+        A single poller long-polls SQS and feeds a bounded queue that
+        max_concurrent workers drain, so polling and processing overlap.
+        
         Args:
             max_concurrent: Override default max concurrent jobs
         """
         if max_concurrent is None:
             max_concurrent = self.max_concurrent_jobs
         
-        semaphore = asyncio.Semaphore(max_concurrent)
+        await self._ensure_clients()
         logger.info(f"Starting job processing with max concurrency: {max_concurrent}")
         
+        # Bounded so the poller stops receiving (and starting visibility timeouts) when workers fall behind
+        queue: asyncio.Queue = asyncio.Queue(maxsize=max_concurrent * 2)
+        workers = [asyncio.create_task(self._worker(queue)) for _ in range(max_concurrent)]
+        
+        try:
+            await self._poller(queue)
+        finally:
+            for worker in workers:
+                worker.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+    
+    async def _poller(self, queue: asyncio.Queue):
+        """
+        Long-poll SQS and hand each message to the worker queue
+        
+        Args:
+            queue: Bounded queue consumed by the workers
+        """
         while True:
             try:
                 # Receive messages from queue
-                response = self.sqs.receive_message(
-                    QueueUrl=self.queue_url,
-                    MaxNumberOfMessages=10,
-                    WaitTimeSeconds=20,  # Long polling
-                    MessageAttributeNames=['All']
-                )
+                response = await self.sqs.receive_message(**self._recv_kwargs)
                 
                 messages = response.get('Messages', [])
                 if not messages:
                     logger.debug("No messages received, continuing to poll...")
+                    self._empty_polls += 1
+                    if self._empty_polls > EMPTY_POLLS_BEFORE_MAX_WAIT:
+                        # Idle queue: use the longest long-poll so a short configured wait can't spin
+                        self._recv_kwargs['WaitTimeSeconds'] = MAX_POLL_WAIT_SECONDS
                     continue
                 
+                if self._empty_polls:
+                    self._empty_polls = 0
+                    self._recv_kwargs['WaitTimeSeconds'] = self.poll_wait_seconds
+                
                 logger.info(f"Received {len(messages)} messages from queue")
                 
-                # Process messages concurrently
-                tasks = []
+                # Blocks while the queue is full, applying back-pressure to polling
                 for message in messages:
-                    task = asyncio.create_task(
-                        self._process_single_job(message, semaphore)
-                    )
-                    tasks.append(task)
-                
-                # Wait for all tasks to complete
-                results = await asyncio.gather(*tasks, return_exceptions=True)
-                
-                # Log any exceptions
-                for i, result in enumerate(results):
-                    if isinstance(result, Exception):
-                        logger.error(f"Task {i} failed with exception: {result}")
+                    await queue.put(message)
                 
             except KeyboardInterrupt:
                 logger.info("Received interrupt signal, shutting down gracefully...")
@@ -250,90 +520,97 @@ class DistributedTestCoordinator:
                 logger.error(f"Error in job processing loop: {e}")
                 await asyncio.sleep(5)  # Brief pause before retrying
     
-    async def _process_single_job(self, message: Dict, semaphore: asyncio.Semaphore):
+    async def _worker(self, queue: asyncio.Queue):
+        """
+        Process messages from the worker queue until cancelled
+        
+        Args:
+            queue: Queue filled by the poller
+        """
+        while True:
+            message = await queue.get()
+            try:
+                await self._process_single_job(message)
+            except Exception as e:
+                logger.error(f"Worker failed to process message: {e}")
+            finally:
+                queue.task_done()
+    
+    async def _process_single_job(self, message: Dict):
         """
         Process a single test job
         
         Args:
             message: SQS message containing job data
-            semaphore: Concurrency control semaphore
         """
-        async with semaphore:
-            receipt_handle = message['ReceiptHandle']
+        receipt_handle = message['ReceiptHandle']
+        job: Optional[TestJob] = None
+        
+        try:
+            # Parse job data
+            job = await asyncio.get_running_loop().run_in_executor(self._cpu_pool, _parse_job, message['Body'])
+            
+            logger.info(f"Processing job {job.id} for {job.language}")
             
+            start_time = time.time()
+            
+            # Generate tests using local LLM
+            test_result = await self._generate_tests(job)
+            
+            execution_time = int((time.time() - start_time) * 1000)
+            test_result.execution_time_ms = execution_time
+            
+            # Store results in S3
+            await self._store_results(job.id, test_result)
+            
+            # Track completion
+            self._track_completed(test_result)
+            
+            # Delete message from queue (job completed successfully)
+            await self._delete_message(receipt_handle)
+            
+            logger.info(f"Completed job {job.id} in {execution_time}ms")
+            
+            # Send success metrics
+            await self._send_metric('JobsCompleted', 1)
+            await self._send_metric('TestsGenerated', test_result.tests_generated)
+            
+        except Exception as e:
+            logger.error(f"Error processing job: {e}")
+            
+            # Handle retry logic: SQS redelivers the message once its visibility
+            # timeout lapses, and the queue's redrive policy moves it to the DLQ
             try:
-                # Parse job data
-                job_data = json.loads(message['Body'])
-                job = TestJob(**job_data)
-                
-                logger.info(f"Processing job {job.id} for {job.language}")
-                
-                start_time = time.time()
-                
-                # Generate tests using local LLM
-                test_result = await self._generate_tests(job)
-                
-                execution_time = int((time.time() - start_time) * 1000)
-                test_result.execution_time_ms = execution_time
-                
-                # Store results in S3
-                await self._store_results(job.id, test_result)
+                if job is None:
+                    # The body never parsed; this raises again and the message is left for the DLQ
+                    job = _parse_job(message['Body'])
+                receive_count = int(message.get('Attributes', {}).get('ApproximateReceiveCount', 1))
                 
-                # Track completion
-                self.completed_jobs[job.id] = test_result
-                if job.id in self.active_jobs:
-                    del self.active_jobs[job.id]
-                
-                # Delete message from queue (job completed successfully)
-                self.sqs.delete_message(
-                    QueueUrl=self.queue_url,
-                    ReceiptHandle=receipt_handle
-                )
-                
-                logger.info(f"Completed job {job.id} in {execution_time}ms")
-                
-                # Send success metrics
-                await self._send_metric('JobsCompleted', 1)
-                await self._send_metric('TestsGenerated', test_result.tests_generated)
-                
-            except Exception as e:
-                logger.error(f"Error processing job: {e}")
-                
-                # Handle retry logic
-                try:
-                    job_data = json.loads(message['Body'])
-                    job = TestJob(**job_data)
-                    
-                    if job.retry_count < job.max_retries:
-                        # Increment retry count and requeue
-                        job.retry_count += 1
-                        await self.submit_test_job(job)
-                        logger.info(f"Requeued job {job.id} (retry {job.retry_count}/{job.max_retries})")
-                    else:
-                        # Max retries exceeded, store failure result
-                        failure_result = TestResult(
-                            job_id=job.id,
-                            success=False,
-                            tests_generated=0,
-                            tests_passed=0,
-                            tests_failed=0,
-                            coverage_percentage=0.0,
-                            execution_time_ms=0,
-                            error_message=str(e)
-                        )
-                        await self._store_results(job.id, failure_result)
-                        logger.error(f"Job {job.id} failed after {job.max_retries} retries")
-                        
-                        await self._send_metric('JobsFailed', 1)
-                    
-                    # Delete the original message
-                    self.sqs.delete_message(
+                if receive_count <= job.max_retries:
+                    # Back off exponentially before SQS makes the message visible again
+                    delay = min(RETRY_BASE_DELAY_SECONDS * 2 ** (receive_count - 1), RETRY_MAX_DELAY_SECONDS)
+                    await self.sqs.change_message_visibility(
                         QueueUrl=self.queue_url,
-                        ReceiptHandle=receipt_handle
+                        ReceiptHandle=receipt_handle,
+                        VisibilityTimeout=delay
                     )
+                    logger.info(f"Retrying job {job.id} in {delay}s (retry {receive_count}/{job.max_retries})")
+                elif receive_count == job.max_retries + 1:
+                    # Max retries exceeded, store failure result and leave the message to the DLQ
+                    failure_result = TestResult.failure(job.id, str(e))
+                    await self._store_results(job.id, failure_result)
+                    self._track_completed(failure_result)
+                    logger.error(f"Job {job.id} failed after {job.max_retries} retries")
                     
-                except Exception as retry_error:
-                    logger.error(f"Error handling job retry: {retry_error}")
+                    await self._send_metric('JobsFailed', 1)
+                else:
+                    # Still being redelivered, so the queue has no redrive policy
+                    logger.warning(f"Dropping job {job.id} after {receive_count} receives; "
+                                   f"configure a dead-letter queue on {self.queue_url}")
+                    await self._delete_message(receipt_handle)
+                
+            except Exception as retry_error:
+                logger.error(f"Error handling job retry: {retry_error}")
     
     async def _generate_tests(self, job: TestJob) -> TestResult:
         """
@@ -380,30 +657,36 @@ describe('{job.id}', () => {{
             generated_tests=generated_tests
         )
     
+    @staticmethod
+    def _result_key(job_id: str, day: datetime) -> str:
+        """S3 key for a job's result, partitioned by the day it was stored"""
+        return f"test-results/{day.strftime('%Y/%m/%d')}/{job_id}.json.gz"
+    
     async def _store_results(self, job_id: str, result: TestResult):
         """
-        Store test results in S3
+        Store gzip-compressed test results in S3
         
         Args:
             job_id: Unique job identifier
             result: TestResult to store
         """
         try:
-            key = f"test-results/{datetime.now().strftime('%Y/%m/%d')}/{job_id}.json"
+            key = self._result_key(job_id, datetime.now())
             
             result_data = {
-                'result': asdict(result),
+                'result': result.to_dict(),
                 'metadata': {
-                    'stored_at': datetime.now(timezone.utc).isoformat(),
-                    'coordinator_version': '1.0.0'
+                    'stored_at': utc_now_iso(),
+                    'coordinator_version': COORDINATOR_VERSION
                 }
             }
             
-            self.s3.put_object(
+            await self.s3.put_object(
                 Bucket=self.result_bucket,
                 Key=key,
-                Body=json.dumps(result_data, indent=2),
+                Body=await asyncio.get_running_loop().run_in_executor(self._cpu_pool, _encode_result, result_data),
                 ContentType='application/json',
+                ContentEncoding='gzip',
                 Metadata={
                     'job-id': job_id,
                     'success': str(result.success),
@@ -419,27 +702,92 @@ describe('{job.id}', () => {{
     
     async def _send_metric(self, metric_name: str, value: float, unit: str = 'Count'):
         """
-        Send custom metric to CloudWatch
+        Buffer a custom metric for the next batched CloudWatch call
         
         Args:
             metric_name: Name of the metric
             value: Metric value
             unit: Metric unit
         """
-        try:
-            self.cloudwatch.put_metric_data(
-                Namespace='AI-Testing-Agent/Distributed',
-                MetricData=[
-                    {
-                        'MetricName': metric_name,
-                        'Value': value,
-                        'Unit': unit,
-                        'Timestamp': datetime.now(timezone.utc)
-                    }
-                ]
-            )
-        except ClientError as e:
-            logger.warning(f"Failed to send metric {metric_name}: {e}")
+        self._metric_buffer.append({
+            'MetricName': metric_name,
+            'Value': value,
+            'Unit': unit,
+            'Timestamp': time.time()
+        })
+        if len(self._metric_buffer) >= METRIC_BATCH_SIZE:
+            await self._flush_metrics()
+    
+    async def _flush_metrics(self):
+        """Send all buffered metrics to CloudWatch in as few requests as possible"""
+        if not self._metric_buffer:
+            return
+        
+        batch, self._metric_buffer = self._metric_buffer, []
+        for i in range(0, len(batch), METRIC_BATCH_SIZE):
+            chunk = batch[i:i + METRIC_BATCH_SIZE]
+            try:
+                await self.cloudwatch.put_metric_data(
+                    Namespace=METRIC_NAMESPACE,
+                    MetricData=chunk
+                )
+            except (ClientError, BotoCoreError) as e:
+                logger.warning(f"Failed to send {len(chunk)} metrics: {e}")
+    
+    async def _delete_message(self, receipt_handle: str):
+        """
+        Queue a processed message for the next batched SQS delete
+        
+        Args:
+            receipt_handle: Receipt handle of the received message
+        """
+        self._delete_buffer.append(receipt_handle)
+        if len(self._delete_buffer) >= SQS_BATCH_SIZE:
+            await self._flush_deletes()
+    
+    async def _flush_deletes(self):
+        """Delete all buffered messages with DeleteMessageBatch, retrying failed entries one by one"""
+        if not self._delete_buffer:
+            return
+        
+        handles, self._delete_buffer = self._delete_buffer, []
+        for i in range(0, len(handles), SQS_BATCH_SIZE):
+            chunk = handles[i:i + SQS_BATCH_SIZE]
+            try:
+                response = await self.sqs.delete_message_batch(
+                    QueueUrl=self.queue_url,
+                    Entries=[{'Id': str(n), 'ReceiptHandle': handle} for n, handle in enumerate(chunk)]
+                )
+            except (ClientError, BotoCoreError) as e:
+                # Keep the unsent handles for the next flush so the messages are not redelivered
+                logger.error(f"Failed to delete {len(handles) - i} messages: {e}")
+                self._delete_buffer[:0] = handles[i:]
+                return
+            
+            for failure in response.get('Failed', []):
+                try:
+                    await self.sqs.delete_message(
+                        QueueUrl=self.queue_url,
+                        ReceiptHandle=chunk[int(failure['Id'])]
+                    )
+                except (ClientError, BotoCoreError) as e:
+                    logger.error(f"Failed to delete message: {e}")
+    
+    async def _periodic_flush(self, flush, interval: float):
+        """
+        Call a flush coroutine on a fixed interval so partial batches are not delayed
+        
+        Args:
+            flush: Coroutine function that sends a buffer
+            interval: Seconds between flushes
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await flush()
+            except Exception as e:
+                # A failed flush must not end the loop; the next one retries what is buffered
+                logger.error(f"Periodic {flush.__name__} failed: {e}")
     
     async def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """
@@ -451,56 +799,205 @@ describe('{job.id}', () => {{
         Returns:
             Job status information
         """
-        if job_id in self.completed_jobs:
-            result = self.completed_jobs[job_id]
-            return {
-                'status': 'completed',
-                'success': result.success,
-                'result': asdict(result)
-            }
-        elif job_id in self.active_jobs:
-            job = self.active_jobs[job_id]
-            return {
-                'status': 'processing',
-                'job': asdict(job),
-                'submitted_at': job.created_at
-            }
-        else:
-            return {
-                'status': 'not_found',
-                'message': f'Job {job_id} not found'
-            }
+        status = self.completed_result_dicts.get(job_id) or self.active_job_dicts.get(job_id)
+        if status is not None:
+            return status
+        
+        # Evicted from the local caches (or completed by another instance): check S3
+        result = await self._load_stored_result(job_id)
+        if result is not None:
+            return self._track_completed(result)
+        
+        return self._not_found(job_id)
+    
+    async def get_completed_result(self, job_id: str) -> Optional[TestResult]:
+        """
+        Get the result of a finished job, wherever it ran
+        
+        Unlike get_job_status, a job this instance submitted is looked up in S3
+        while its cached status is still 'processing', so results stored by
+        other instances are found.
+        
+        Args:
+            job_id: Job identifier
+            
+        Returns:
+            The TestResult, or None while no result has been stored
+        """
+        result = self.completed_jobs.get(job_id)
+        if result is None:
+            result = await self._load_stored_result(job_id)
+            if result is not None:
+                self._track_completed(result)
+        return result
+    
+    def get_job_status_sync(self, job_id: str) -> Dict[str, Any]:
+        """
+        Get the status of a specific job without an event loop
+        
+        Args:
+            job_id: Job identifier
+            
+        Returns:
+            Job status information
+        """
+        status = self.completed_result_dicts.get(job_id) or self.active_job_dicts.get(job_id)
+        if status is not None:
+            return status
+        
+        s3 = self._sync_client('s3')
+        for key in self._stored_result_keys(job_id):
+            try:
+                response = s3.get_object(Bucket=self.result_bucket, Key=key)
+                return self._track_completed(_decode_result(response['Body'].read()))
+            except ClientError as e:
+                if not self._is_missing_key(e):
+                    logger.warning(f"Failed to load stored result for job {job_id}: {e}")
+                    break
+        
+        return self._not_found(job_id)
+    
+    @staticmethod
+    def _not_found(job_id: str) -> Dict[str, Any]:
+        return {
+            'status': 'not_found',
+            'message': f'Job {job_id} not found'
+        }
+    
+    def _sync_client(self, service: str):
+        """Plain boto3 client for the synchronous helpers, created on first use"""
+        client = self._sync_clients.get(service)
+        if client is None:
+            import boto3
+            client = self._sync_clients[service] = boto3.client(service, region_name=self.region)
+        return client
+    
+    def _track_active(self, job: TestJob):
+        """Record a submitted job and its cached status response"""
+        self._queue_stats_cache = None  # The queue depth just changed
+        self.active_jobs[job.id] = job
+        self.active_job_dicts[job.id] = {
+            'status': 'processing',
+            'job': job.to_dict(),
+            'submitted_at': job.created_at
+        }
+    
+    def _track_completed(self, result: TestResult) -> Dict[str, Any]:
+        """Record a finished job and return its cached status response"""
+        status = {
+            'status': 'completed',
+            'success': result.success,
+            'result': result.to_dict()
+        }
+        self.completed_jobs[result.job_id] = result
+        self.completed_result_dicts[result.job_id] = status
+        self.active_jobs.pop(result.job_id, None)
+        self.active_job_dicts.pop(result.job_id, None)
+        for listener in self._completion_listeners:
+            listener(result)
+        return status
+    
+    def add_completion_listener(self, listener: Callable[[TestResult], None]):
+        """
+        Register a callback invoked with every completed job's TestResult
+        
+        Args:
+            listener: Called from the event loop; must not block
+        """
+        self._completion_listeners.append(listener)
+    
+    def remove_completion_listener(self, listener: Callable[[TestResult], None]):
+        """Unregister a callback added with add_completion_listener"""
+        self._completion_listeners.remove(listener)
+    
+    async def _load_stored_result(self, job_id: str) -> Optional[TestResult]:
+        """
+        Look up a job result stored in S3 today or yesterday
+        
+        Args:
+            job_id: Job identifier
+            
+        Returns:
+            The stored TestResult, or None if no result exists
+        """
+        await self._ensure_clients()
+        
+        for key in self._stored_result_keys(job_id):
+            try:
+                response = await self.s3.get_object(Bucket=self.result_bucket, Key=key)
+                async with response['Body'] as stream:
+                    return _decode_result(await stream.read())
+            except ClientError as e:
+                if not self._is_missing_key(e):
+                    logger.warning(f"Failed to load stored result for job {job_id}: {e}")
+                    return None
+        
+        return None
+    
+    def _stored_result_keys(self, job_id: str) -> List[str]:
+        """Keys a recent result may be stored under: today's partition, then yesterday's"""
+        today = datetime.now()
+        return [self._result_key(job_id, today), self._result_key(job_id, today - timedelta(days=1))]
+    
+    @staticmethod
+    def _is_missing_key(error: ClientError) -> bool:
+        return error.response.get('Error', {}).get('Code') in ('NoSuchKey', '404')
     
     async def get_queue_stats(self) -> Dict[str, Any]:
         """
         Get queue statistics
         
+        Responses are reused for QUEUE_STATS_TTL_SECONDS unless jobs were
+        submitted in the meantime.
+        
         Returns:
             Queue statistics including message counts
         """
+        cached = self._queue_stats_cache
+        if cached is not None and time.monotonic() - cached[0] < QUEUE_STATS_TTL_SECONDS:
+            return cached[1]
+        
+        await self._ensure_clients()
+        
         try:
-            response = self.sqs.get_queue_attributes(
+            response = await self.sqs.get_queue_attributes(
                 QueueUrl=self.queue_url,
-                AttributeNames=[
-                    'ApproximateNumberOfMessages',
-                    'ApproximateNumberOfMessagesNotVisible',
-                    'ApproximateNumberOfMessagesDelayed'
-                ]
+                AttributeNames=QUEUE_STATS_ATTRIBUTES
             )
+            stats = self._queue_stats(response['Attributes'])
+            self._queue_stats_cache = (time.monotonic(), stats)
+            return stats
             
-            attributes = response['Attributes']
-            
-            return {
-                'messages_available': int(attributes.get('ApproximateNumberOfMessages', 0)),
-                'messages_in_flight': int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0)),
-                'messages_delayed': int(attributes.get('ApproximateNumberOfMessagesDelayed', 0)),
-                'active_jobs': len(self.active_jobs),
-                'completed_jobs': len(self.completed_jobs)
-            }
+        except ClientError as e:
+            logger.error(f"Failed to get queue stats: {e}")
+            return {'error': str(e)}
+    
+    def get_queue_stats_sync(self) -> Dict[str, Any]:
+        """
+        Get queue statistics without an event loop
+        
+        Returns:
+            Queue statistics including message counts
+        """
+        try:
+            response = self._sync_client('sqs').get_queue_attributes(
+                QueueUrl=self.queue_url,
+                AttributeNames=QUEUE_STATS_ATTRIBUTES
+            )
+            return self._queue_stats(response['Attributes'])
             
         except ClientError as e:
             logger.error(f"Failed to get queue stats: {e}")
             return {'error': str(e)}
+    
+    def _queue_stats(self, attributes: Dict[str, str]) -> Dict[str, Any]:
+        return {
+            'messages_available': int(attributes.get('ApproximateNumberOfMessages', 0)),
+            'messages_in_flight': int(attributes.get('ApproximateNumberOfMessagesNotVisible', 0)),
+            'messages_delayed': int(attributes.get('ApproximateNumberOfMessagesDelayed', 0)),
+            'active_jobs': len(self.active_jobs),
+            'completed_jobs': len(self.completed_jobs)
+        }
 
 # CLI interface for testing
 if __name__ == "__main__":
@@ -525,22 +1022,25 @@ if __name__ == "__main__":
     )
     
     async def main():
-        if args.action == 'process':
-            await coordinator.process_test_jobs()
-        elif args.action == 'submit' and args.code and args.language:
-            job = TestJob(
-                id=f"test-{int(time.time())}",
-                code=args.code,
-                language=args.language
-            )
-            message_id = await coordinator.submit_test_job(job)
-            print(f"Submitted job {job.id} with message ID {message_id}")
-        elif args.action == 'status':
-            if args.job_id:
-                status = await coordinator.get_job_status(args.job_id)
-                print(json.dumps(status, indent=2))
-            else:
-                stats = await coordinator.get_queue_stats()
-                print(json.dumps(stats, indent=2))
-    
-    asyncio.run(main()) 
\ No newline at end of file
+        async with coordinator:
+            if args.action == 'process':
+                await coordinator.process_test_jobs()
+            elif args.action == 'submit' and args.code and args.language:
+                job = TestJob(
+                    id=f"test-{int(time.time())}",
+                    code=args.code,
+                    language=args.language
+                )
+                message_id = await coordinator.submit_test_job(job)
+                print(f"Submitted job {job.id} with message ID {message_id}")
+    
+    # Status checks are single request/response calls; skip starting an event loop for them
+    if args.action == 'status':
+        if args.job_id:
+            status = coordinator.get_job_status_sync(args.job_id)
+            print(json.dumps(status, indent=2))
+        else:
+            stats = coordinator.get_queue_stats_sync()
+            print(json.dumps(stats, indent=2))
+    else:
+        asyncio.run(main()) 
\ No newline at end of file
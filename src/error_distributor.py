@@ -6,17 +6,57 @@ Intelligent error classification and routing for distributed error fixing
 import asyncio
 import json
 import logging
+import os
 import re
 import time
+import uuid
+from functools import lru_cache
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
 from enum import Enum
-import boto3
-from botocore.exceptions import ClientError
+from contextlib import AsyncExitStack
+import orjson
+from cachetools import LRUCache
+from aiobotocore.session import get_session
+from botocore.exceptions import BotoCoreError, ClientError
 
 logger = logging.getLogger(__name__)
 
+# Errors in these files block the whole app, so their fixes get a priority boost
+CRITICAL_PATHS = (
+    'src/main', 'src/app', 'src/index',
+    'package.json', 'tsconfig.json', 'vite.config'
+)
+
+METRIC_NAMESPACE = 'AI-Testing-Agent/ErrorDistribution'
+METRIC_BATCH_SIZE = 500  # PutMetricData accepts up to 1000 entries per call
+METRIC_FLUSH_INTERVAL_SECONDS = 1.0
+SQS_BATCH_SIZE = 10  # SendMessageBatch limit
+JOB_CACHE_SIZE = 10_000
+MAX_CONCURRENT_RESULT_FETCHES = 32
+COMPLEXITY_RANK = {'simple': 0, 'complex': 1, 'advanced': 2}
+
+# Simple heuristics for complexity, most complex first: the first level with a
+# matching indicator wins. Indicators are literals, matched case-insensitively.
+COMPLEXITY_INDICATORS = {
+    'advanced': (
+        'Generic type', 'Conditional type', 'Mapped type',
+        'Complex union', 'Intersection type', 'Build failed'
+    ),
+    'complex': (
+        'Type is not assignable', 'Cannot find name', 'Hook call',
+        'Test failed', 'Cannot read property'
+    ),
+    'simple': (
+        'Missing semicolon', 'Unused variable', 'Prefer const',
+        'Missing return type', 'Property does not exist'
+    )
+}
+
+# CI error streams repeat the same messages across files, so classification is memoized
+CLASSIFICATION_CACHE_SIZE = 4096
+
 class ErrorType(Enum):
     """Types of errors that can be classified and routed"""
     TYPESCRIPT = "typescript"
@@ -27,6 +67,23 @@ class ErrorType(Enum):
     RUNTIME = "runtime"
     DEPENDENCY = "dependency"
     GENERAL = "general"
+    
+    def __init__(self, value):
+        # Definition-order position, used to index per-type lookup tuples
+        # (Enum.__hash__ is implemented in Python, so dict lookups on members are slow)
+        self.index = len(type(self).__members__)
+
+# Priority boost per error type, indexed by ErrorType.index
+TYPE_MULTIPLIERS = (
+    1.2,  # TYPESCRIPT
+    1.1,  # REACT
+    1.0,  # TEST
+    0.8,  # LINT
+    1.3,  # BUILD
+    1.1,  # RUNTIME
+    1.2,  # DEPENDENCY
+    0.9,  # GENERAL
+)
 
 class ErrorSeverity(Enum):
     """Error severity levels for prioritization"""
@@ -35,7 +92,7 @@ class ErrorSeverity(Enum):
     MEDIUM = 3    # Degrades experience
     LOW = 4       # Minor issues
 
-@dataclass
+@dataclass(slots=True)
 class ErrorContext:
     """Context information for an error"""
     file_path: str
@@ -44,8 +101,19 @@ class ErrorContext:
     function_name: Optional[str] = None
     class_name: Optional[str] = None
     surrounding_code: Optional[str] = None
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of the context fields (faster than dataclasses.asdict)"""
+        return {
+            'file_path': self.file_path,
+            'line_number': self.line_number,
+            'column_number': self.column_number,
+            'function_name': self.function_name,
+            'class_name': self.class_name,
+            'surrounding_code': self.surrounding_code
+        }
 
-@dataclass
+@dataclass(slots=True)
 class ErrorJob:
     """Represents an error fixing job to be distributed"""
     id: str
@@ -58,12 +126,38 @@ class ErrorJob:
     retry_count: int = 0
     max_retries: int = 3
     created_at: str = None
+    _dict_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.created_at is None:
             self.created_at = datetime.now(timezone.utc).isoformat()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """JSON-ready dict of the job, with enums as their values"""
+        return {
+            'id': self.id,
+            'error_type': self.error_type.value,
+            'severity': self.severity.value,
+            'message': self.message,
+            'context': self.context.to_dict(),
+            'suggested_model': self.suggested_model,
+            'priority_score': self.priority_score,
+            'retry_count': self.retry_count,
+            'max_retries': self.max_retries,
+            'created_at': self.created_at
+        }
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """to_dict() computed once; jobs are not modified after creation"""
+        if self._dict_cache is None:
+            self._dict_cache = self.to_dict()
+        return self._dict_cache
+    
+    def message_body(self) -> str:
+        """JSON body for SQS"""
+        return orjson.dumps(self.as_dict()).decode()
 
-@dataclass
+@dataclass(slots=True)
 class ErrorFixResult:
     """Result of an error fixing attempt"""
     job_id: str
@@ -75,10 +169,58 @@ class ErrorFixResult:
     model_used: str = ""
     error_message: Optional[str] = None
     completed_at: str = None
+    _dict_cache: Optional[Dict[str, Any]] = field(default=None, init=False, repr=False, compare=False)
     
     def __post_init__(self):
         if self.completed_at is None:
             self.completed_at = datetime.now(timezone.utc).isoformat()
+    
+    def to_dict(self) -> Dict[str, Any]:
+        """Flat dict of the result fields (faster than dataclasses.asdict)"""
+        return {
+            'job_id': self.job_id,
+            'success': self.success,
+            'fixed_code': self.fixed_code,
+            'explanation': self.explanation,
+            'confidence_score': self.confidence_score,
+            'execution_time_ms': self.execution_time_ms,
+            'model_used': self.model_used,
+            'error_message': self.error_message,
+            'completed_at': self.completed_at
+        }
+    
+    def as_dict(self) -> Dict[str, Any]:
+        """to_dict() computed once; results are not modified after creation"""
+        if self._dict_cache is None:
+            self._dict_cache = self.to_dict()
+        return self._dict_cache
+
+def _uuid7() -> uuid.UUID:
+    """
+    Time-ordered UUID (RFC 9562 version 7)
+    
+    48-bit Unix millisecond timestamp followed by random bits, so ids sort by
+    creation time. The stdlib only gains uuid.uuid7() in Python 3.14.
+    """
+    value = (time.time_ns() // 1_000_000) << 80 | int.from_bytes(os.urandom(10), 'big')
+    value = (value & ~(0xF << 76)) | (0x7 << 76)  # version
+    value = (value & ~(0x3 << 62)) | (0x2 << 62)  # RFC 4122 variant
+    return uuid.UUID(int=value)
+
+def _fuse_patterns(pattern_table: Dict[str, List[str]]) -> 're.Pattern[str]':
+    """
+    Fuse an ordered {name: [patterns]} table into a single regex
+    
+    Each name becomes a lookahead branch anchored at the start of the text, so
+    pattern.match(text).lastgroup is the first name in table order with any
+    pattern matching anywhere in the text - the same answer as checking each
+    name's patterns in turn, but in one regex call.
+    """
+    branches = []
+    for name, patterns in pattern_table.items():
+        alternatives = '|'.join(f'(?:{pattern})' for pattern in patterns)
+        branches.append(f'(?=[\\s\\S]*?(?P<{name}>{alternatives}))')
+    return re.compile('|'.join(branches), re.IGNORECASE)
 
 class ErrorClassifier:
     """Classifies errors and determines appropriate fixing strategies"""
@@ -168,6 +310,26 @@ class ErrorClassifier:
             ]
         }
         
+        # Compiled once here; the classify methods run for every distributed error
+        self._critical_path_regex = re.compile('|'.join(map(re.escape, CRITICAL_PATHS)), re.IGNORECASE)
+        
+        # One fused regex per (TypeScript file, test file) combination. TypeScript files check
+        # TS patterns first and test files check test patterns first; the rest follow table order.
+        self._error_type_regexes = {}
+        for is_ts_file in (False, True):
+            for is_test_file in (False, True):
+                order = [ErrorType.TYPESCRIPT] if is_ts_file else []
+                if is_test_file:
+                    order.append(ErrorType.TEST)
+                order += [error_type for error_type in self.error_patterns if error_type not in order]
+                self._error_type_regexes[is_ts_file, is_test_file] = _fuse_patterns(
+                    {error_type.name: self.error_patterns[error_type] for error_type in order})
+        self._severity_regex = _fuse_patterns(
+            {severity.name: patterns for severity, patterns in self.severity_patterns.items()})
+        
+        # Patterns never change after init, so results only depend on these arguments
+        self._classify_cached = lru_cache(maxsize=CLASSIFICATION_CACHE_SIZE)(self._classify)
+        
         # Model recommendations based on error type and complexity
         self.model_recommendations = {
             ErrorType.TYPESCRIPT: {
@@ -211,6 +373,7 @@ class ErrorClassifier:
                 "advanced": "deepseek-coder:6.7b"
             }
         }
+        self._model_table = tuple(self.model_recommendations.get(error_type, {}) for error_type in ErrorType)
     
     def classify_error(self, error_message: str, context: ErrorContext) -> Tuple[ErrorType, ErrorSeverity]:
         """
@@ -223,41 +386,34 @@ class ErrorClassifier:
         Returns:
             Tuple of (ErrorType, ErrorSeverity)
         """
-        error_type = self._classify_error_type(error_message, context)
-        severity = self._classify_severity(error_message, context)
-        
-        return error_type, severity
-    
-    def _classify_error_type(self, error_message: str, context: ErrorContext) -> ErrorType:
-        """Classify the type of error based on message and context"""
-        # Check file extension for additional context
-        file_ext = context.file_path.split('.')[-1].lower() if context.file_path else ""
+        # Nothing can match a blank message; skip the feature extraction and cache
+        if not error_message or error_message.isspace():
+            return ErrorType.GENERAL, ErrorSeverity.MEDIUM
         
-        # TypeScript files get priority for TS classification
-        if file_ext in ['ts', 'tsx'] and any(re.search(pattern, error_message, re.IGNORECASE) 
-                                           for pattern in self.error_patterns[ErrorType.TYPESCRIPT]):
-            return ErrorType.TYPESCRIPT
+        # Check file extension and path for additional context
+        file_path = context.file_path.lower()
+        file_ext = file_path.split('.')[-1] if file_path else ""
+        is_test_file = 'test' in file_path or 'spec' in file_path
         
-        # Test files get priority for test classification
-        if ('test' in context.file_path.lower() or 'spec' in context.file_path.lower()) and \
-           any(re.search(pattern, error_message, re.IGNORECASE) 
-               for pattern in self.error_patterns[ErrorType.TEST]):
-            return ErrorType.TEST
-        
-        # Check all patterns
-        for error_type, patterns in self.error_patterns.items():
-            if any(re.search(pattern, error_message, re.IGNORECASE) for pattern in patterns):
-                return error_type
+        return self._classify_cached(error_message, file_ext, is_test_file)
+    
+    def _classify(self, error_message: str, file_ext: str, is_test_file: bool) -> Tuple[ErrorType, ErrorSeverity]:
+        error_type = self._classify_error_type(error_message, file_ext, is_test_file)
+        severity = self._classify_severity(error_message)
         
-        return ErrorType.GENERAL
+        return error_type, severity
+    
+    def _classify_error_type(self, error_message: str, file_ext: str, is_test_file: bool) -> ErrorType:
+        """Classify the type of error based on message and file context"""
+        # TypeScript and test files get priority for TS and test classification
+        regex = self._error_type_regexes[file_ext in ('ts', 'tsx'), is_test_file]
+        match = regex.match(error_message)
+        return ErrorType[match.lastgroup] if match else ErrorType.GENERAL
     
-    def _classify_severity(self, error_message: str, context: ErrorContext) -> ErrorSeverity:
+    def _classify_severity(self, error_message: str) -> ErrorSeverity:
         """Classify the severity of an error"""
-        for severity, patterns in self.severity_patterns.items():
-            if any(re.search(pattern, error_message, re.IGNORECASE) for pattern in patterns):
-                return severity
-        
-        return ErrorSeverity.MEDIUM  # Default severity
+        match = self._severity_regex.match(error_message)
+        return ErrorSeverity[match.lastgroup] if match else ErrorSeverity.MEDIUM  # Default severity
     
     def recommend_model(self, error_type: ErrorType, complexity: str = "simple") -> str:
         """
@@ -270,9 +426,7 @@ class ErrorClassifier:
         Returns:
             Recommended model name
         """
-        return self.model_recommendations.get(error_type, {}).get(
-            complexity, "deepseek-coder:1.3b"
-        )
+        return self._model_table[error_type.index].get(complexity, "deepseek-coder:1.3b")
     
     def calculate_priority_score(self, error_type: ErrorType, severity: ErrorSeverity, 
                                 context: ErrorContext) -> float:
@@ -290,27 +444,11 @@ class ErrorClassifier:
         base_score = 10.0 - severity.value  # Critical=9, High=8, Medium=7, Low=6
         
         # Boost priority for certain error types
-        type_multipliers = {
-            ErrorType.TYPESCRIPT: 1.2,
-            ErrorType.BUILD: 1.3,
-            ErrorType.REACT: 1.1,
-            ErrorType.TEST: 1.0,
-            ErrorType.LINT: 0.8,
-            ErrorType.RUNTIME: 1.1,
-            ErrorType.DEPENDENCY: 1.2,
-            ErrorType.GENERAL: 0.9
-        }
-        
-        score = base_score * type_multipliers.get(error_type, 1.0)
+        score = base_score * TYPE_MULTIPLIERS[error_type.index]
         
         # Boost priority for critical files
-        if context.file_path:
-            critical_paths = [
-                'src/main', 'src/app', 'src/index', 
-                'package.json', 'tsconfig.json', 'vite.config'
-            ]
-            if any(critical in context.file_path.lower() for critical in critical_paths):
-                score *= 1.2
+        if context.file_path and self._critical_path_regex.search(context.file_path):
+            score *= 1.2
         
         return round(score, 2)
 
@@ -320,7 +458,8 @@ class ErrorDistributor:
     def __init__(self, 
                  error_queue_url: str, 
                  result_bucket: str,
-                 region: str = 'us-east-1'):
+                 region: str = 'us-east-1',
+                 concurrency: int = 16):
         """
         Initialize the error distributor
         
@@ -328,26 +467,88 @@ class ErrorDistributor:
             error_queue_url: SQS queue URL for error jobs
             result_bucket: S3 bucket for storing fix results
             region: AWS region
+            concurrency: Maximum SQS batch submissions in flight
         """
         self.error_queue_url = error_queue_url
         self.result_bucket = result_bucket
         self.region = region
+        self.concurrency = max(1, concurrency)
         
-        # Initialize AWS clients
-        try:
-            self.sqs = boto3.client('sqs', region_name=region)
-            self.s3 = boto3.client('s3', region_name=region)
-            self.cloudwatch = boto3.client('cloudwatch', region_name=region)
-        except Exception as e:
-            logger.error(f"Failed to initialize AWS clients: {e}")
-            raise
+        # AWS clients are async (aiobotocore) and created on first use inside the event loop
+        self._session = get_session()
+        self._client_stack: Optional[AsyncExitStack] = None
+        self._clients_lock = asyncio.Lock()
+        self.sqs = None
+        self.s3 = None
+        self.cloudwatch = None
+        
+        # Metrics are buffered and sent to CloudWatch in batches by a background task
+        self._metric_buffer: List[Dict[str, Any]] = []
+        self._metrics_task: Optional[asyncio.Task] = None
         
         self.classifier = ErrorClassifier()
-        self.active_jobs: Dict[str, ErrorJob] = {}
-        self.completed_jobs: Dict[str, ErrorFixResult] = {}
+        
+        # Zero-width so finditer reports every indicator position, including overlapping ones
+        self._complexity_regex = re.compile('(?=' + '|'.join(
+            f"(?P<{level}>{'|'.join(map(re.escape, indicators))})"
+            for level, indicators in COMPLEXITY_INDICATORS.items()
+        ) + ')', re.IGNORECASE)
+        self._complexity_level = lru_cache(maxsize=CLASSIFICATION_CACHE_SIZE)(self._match_complexity_level)
+        
+        # Bounded so a long-running distributor evicts the oldest jobs instead of growing forever
+        self.active_jobs: Dict[str, ErrorJob] = LRUCache(JOB_CACHE_SIZE)
+        self.completed_jobs: Dict[str, ErrorFixResult] = LRUCache(JOB_CACHE_SIZE)
         
         logger.info(f"Initialized ErrorDistributor for region {region}")
     
+    async def __aenter__(self) -> 'ErrorDistributor':
+        await self._ensure_clients()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _ensure_clients(self):
+        """Create the async SQS, S3 and CloudWatch clients once per distributor"""
+        if self.sqs is not None:
+            return
+        
+        async with self._clients_lock:
+            if self.sqs is not None:
+                return
+            
+            stack = AsyncExitStack()
+            try:
+                self.s3 = await stack.enter_async_context(
+                    self._session.create_client('s3', region_name=self.region))
+                self.cloudwatch = await stack.enter_async_context(
+                    self._session.create_client('cloudwatch', region_name=self.region))
+                self.sqs = await stack.enter_async_context(
+                    self._session.create_client('sqs', region_name=self.region))
+            except Exception as e:
+                await stack.aclose()
+                logger.error(f"Failed to initialize AWS clients: {e}")
+                raise
+            
+            self._client_stack = stack
+            self._metrics_task = asyncio.create_task(self._metrics_flusher())
+    
+    async def close(self):
+        """Flush buffered metrics, then close the AWS clients and release their connection pools"""
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            try:
+                await self._metrics_task
+            except asyncio.CancelledError:
+                pass
+            self._metrics_task = None
+        
+        if self._client_stack is not None:
+            await self._flush_metrics()
+            await self._client_stack.aclose()
+            self._client_stack = None
+            self.sqs = self.s3 = self.cloudwatch = None
+    
     async def distribute_errors(self, errors: List[Dict[str, Any]]) -> List[str]:
         """
         Distribute a batch of errors for fixing
@@ -358,84 +559,131 @@ class ErrorDistributor:
         Returns:
             List of job IDs for tracking
         """
-        job_ids = []
+        await self._ensure_clients()
+        job_ids: List[str] = []
         
-        for error_data in errors:
-            try:
-                # Create error context
-                context = ErrorContext(
-                    file_path=error_data.get('file', ''),
-                    line_number=error_data.get('line'),
-                    column_number=error_data.get('column'),
-                    function_name=error_data.get('function'),
-                    class_name=error_data.get('class'),
-                    surrounding_code=error_data.get('code_context')
-                )
-                
-                # Classify error
-                error_type, severity = self.classifier.classify_error(
-                    error_data['message'], context
-                )
-                
-                # Determine complexity and model
-                complexity = self._determine_complexity(error_data['message'], context)
-                suggested_model = self.classifier.recommend_model(error_type, complexity)
-                
-                # Calculate priority
-                priority_score = self.classifier.calculate_priority_score(
-                    error_type, severity, context
-                )
-                
-                # Create error job
-                job = ErrorJob(
-                    id=f"error-{int(time.time())}-{hash(error_data['message']) % 10000}",
-                    error_type=error_type,
-                    severity=severity,
-                    message=error_data['message'],
-                    context=context,
-                    suggested_model=suggested_model,
-                    priority_score=priority_score
-                )
-                
-                # Submit to queue
-                job_id = await self._submit_error_job(job)
-                job_ids.append(job_id)
-                
-                logger.info(f"Distributed error job {job.id}: {error_type.value} "
-                           f"(severity: {severity.value}, priority: {priority_score})")
+        # Batches of 10 (SQS limit) go through a bounded queue to a fixed pool of workers,
+        # so classification overlaps submission and a slow SQS throttles the producer
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.concurrency * 2)
+        workers = [asyncio.create_task(self._submit_worker(queue, job_ids)) for _ in range(self.concurrency)]
+        
+        try:
+            batch = []
+            for error_data in errors:
+                try:
+                    batch.append(self._create_error_job(error_data))
+                except Exception as e:
+                    logger.error(f"Failed to distribute error: {error_data.get('message', 'Unknown')}: {e}")
+                    continue
                 
-            except Exception as e:
-                logger.error(f"Failed to distribute error: {error_data.get('message', 'Unknown')}: {e}")
+                if len(batch) == SQS_BATCH_SIZE:
+                    await queue.put(batch)
+                    batch = []
+            if batch:
+                await queue.put(batch)
+            
+            # One sentinel per worker, then wait for the queue to drain
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            for worker in workers:
+                worker.cancel()
         
         await self._send_metric('ErrorsDistributed', len(job_ids))
         return job_ids
     
+    async def _submit_worker(self, queue: asyncio.Queue, job_ids: List[str]):
+        """Submit job batches from the queue until a None sentinel arrives"""
+        while True:
+            batch = await queue.get()
+            if batch is None:
+                return
+            
+            try:
+                job_ids.extend(await self._submit_error_batch(batch))
+            except Exception as e:
+                logger.error(f"Failed to distribute batch of {len(batch)} error jobs: {e}")
+    
+    def _create_error_job(self, error_data: Dict[str, Any]) -> ErrorJob:
+        """Classify a raw error and build its fixing job"""
+        # Create error context
+        context = ErrorContext(
+            file_path=error_data.get('file', ''),
+            line_number=error_data.get('line'),
+            column_number=error_data.get('column'),
+            function_name=error_data.get('function'),
+            class_name=error_data.get('class'),
+            surrounding_code=error_data.get('code_context')
+        )
+        
+        # Classify error
+        error_type, severity = self.classifier.classify_error(
+            error_data['message'], context
+        )
+        
+        # Determine complexity and model
+        complexity = self._determine_complexity(error_data['message'], context)
+        suggested_model = self.classifier.recommend_model(error_type, complexity)
+        
+        # Calculate priority
+        priority_score = self.classifier.calculate_priority_score(
+            error_type, severity, context
+        )
+        
+        # Create error job
+        return ErrorJob(
+            id=f"error-{_uuid7()}",
+            error_type=error_type,
+            severity=severity,
+            message=error_data['message'],
+            context=context,
+            suggested_model=suggested_model,
+            priority_score=priority_score
+        )
+    
+    async def _submit_error_batch(self, batch: List[ErrorJob]) -> List[str]:
+        """Submit up to 10 error jobs with one SendMessageBatch call"""
+        # Entry ids are batch positions: job ids are not guaranteed unique within a batch
+        response = await self.sqs.send_message_batch(
+            QueueUrl=self.error_queue_url,
+            Entries=[{
+                'Id': str(n),
+                'MessageBody': job.message_body(),
+                'MessageAttributes': self._message_attributes(job)
+            } for n, job in enumerate(batch)]
+        )
+        
+        message_ids = []
+        for success in response.get('Successful', []):
+            job = batch[int(success['Id'])]
+            self.active_jobs[job.id] = job
+            message_ids.append(success['MessageId'])
+            
+            logger.info(f"Distributed error job {job.id}: {job.error_type.value} "
+                       f"(severity: {job.severity.value}, priority: {job.priority_score})")
+        
+        for failure in response.get('Failed', []):
+            job = batch[int(failure['Id'])]
+            if failure.get('SenderFault'):
+                logger.error(f"Failed to submit error job {job.id}: {failure.get('Message')}")
+                continue
+            
+            # Server-side failures are transient; retry the job on its own once
+            try:
+                message_ids.append(await self._submit_error_job(job))
+            except ClientError:
+                pass  # Already logged by _submit_error_job
+        
+        return message_ids
+    
     async def _submit_error_job(self, job: ErrorJob) -> str:
         """Submit an error job to the SQS queue"""
         try:
-            message_body = json.dumps(asdict(job), default=str)
-            
-            response = self.sqs.send_message(
+            response = await self.sqs.send_message(
                 QueueUrl=self.error_queue_url,
-                MessageBody=message_body,
-                MessageAttributes={
-                    'ErrorType': {
-                        'StringValue': job.error_type.value,
-                        'DataType': 'String'
-                    },
-                    'Severity': {
-                        'StringValue': str(job.severity.value),
-                        'DataType': 'Number'
-                    },
-                    'Priority': {
-                        'StringValue': str(job.priority_score),
-                        'DataType': 'Number'
-                    },
-                    'Model': {
-                        'StringValue': job.suggested_model,
-                        'DataType': 'String'
-                    }
-                }
+                MessageBody=job.message_body(),
+                MessageAttributes=self._message_attributes(job)
             )
             
             message_id = response['MessageId']
@@ -447,37 +695,33 @@ class ErrorDistributor:
             logger.error(f"Failed to submit error job {job.id}: {e}")
             raise
     
+    @staticmethod
+    def _message_attributes(job: ErrorJob) -> Dict[str, Dict[str, str]]:
+        """SQS MessageAttributes used to route an error job"""
+        return {
+            'ErrorType': {
+                'StringValue': job.error_type.value,
+                'DataType': 'String'
+            },
+            'Severity': {
+                'StringValue': str(job.severity.value),
+                'DataType': 'Number'
+            },
+            'Priority': {
+                'StringValue': str(job.priority_score),
+                'DataType': 'Number'
+            },
+            'Model': {
+                'StringValue': job.suggested_model,
+                'DataType': 'String'
+            }
+        }
+    
     def _determine_complexity(self, error_message: str, context: ErrorContext) -> str:
         """Determine the complexity level of an error for model selection"""
-        # Simple heuristics for complexity
-        complexity_indicators = {
-            'simple': [
-                'Missing semicolon', 'Unused variable', 'Prefer const',
-                'Missing return type', 'Property does not exist'
-            ],
-            'complex': [
-                'Type is not assignable', 'Cannot find name', 'Hook call',
-                'Test failed', 'Cannot read property'
-            ],
-            'advanced': [
-                'Generic type', 'Conditional type', 'Mapped type',
-                'Complex union', 'Intersection type', 'Build failed'
-            ]
-        }
-        
-        error_lower = error_message.lower()
-        
-        # Check for advanced patterns first
-        if any(indicator.lower() in error_lower for indicator in complexity_indicators['advanced']):
-            return 'advanced'
-        
-        # Check for complex patterns
-        if any(indicator.lower() in error_lower for indicator in complexity_indicators['complex']):
-            return 'complex'
-        
-        # Check for simple patterns
-        if any(indicator.lower() in error_lower for indicator in complexity_indicators['simple']):
-            return 'simple'
+        level = self._complexity_level(error_message)
+        if level is not None:
+            return level
         
         # Default based on error length and context
         if len(error_message) > 200 or (context.surrounding_code and len(context.surrounding_code) > 500):
@@ -485,6 +729,19 @@ class ErrorDistributor:
         
         return 'simple'
     
+    def _match_complexity_level(self, error_message: str) -> Optional[str]:
+        """Complexity level named by the message's indicators, if any"""
+        # Single left-to-right scan that stops at the first advanced indicator,
+        # since nothing can outrank it
+        best = None
+        for match in self._complexity_regex.finditer(error_message):
+            level = match.lastgroup
+            if level == 'advanced':
+                return level
+            if best is None or COMPLEXITY_RANK[level] > COMPLEXITY_RANK[best]:
+                best = level
+        return best
+    
     async def get_job_status(self, job_id: str) -> Dict[str, Any]:
         """Get the status of a specific error fixing job"""
         if job_id in self.completed_jobs:
@@ -492,13 +749,13 @@ class ErrorDistributor:
             return {
                 'status': 'completed',
                 'success': result.success,
-                'result': asdict(result)
+                'result': result.as_dict()
             }
         elif job_id in self.active_jobs:
             job = self.active_jobs[job_id]
             return {
                 'status': 'processing',
-                'job': asdict(job),
+                'job': job.as_dict(),
                 'submitted_at': job.created_at
             }
         else:
@@ -509,8 +766,10 @@ class ErrorDistributor:
     
     async def get_queue_stats(self) -> Dict[str, Any]:
         """Get error queue statistics"""
+        await self._ensure_clients()
+        
         try:
-            response = self.sqs.get_queue_attributes(
+            response = await self.sqs.get_queue_attributes(
                 QueueUrl=self.error_queue_url,
                 AttributeNames=[
                     'ApproximateNumberOfMessages',
@@ -534,28 +793,87 @@ class ErrorDistributor:
             return {'error': str(e)}
     
     async def _send_metric(self, metric_name: str, value: float, unit: str = 'Count'):
-        """Send custom metric to CloudWatch"""
-        try:
-            self.cloudwatch.put_metric_data(
-                Namespace='AI-Testing-Agent/ErrorDistribution',
-                MetricData=[
-                    {
-                        'MetricName': metric_name,
-                        'Value': value,
-                        'Unit': unit,
-                        'Timestamp': datetime.now(timezone.utc)
-                    }
-                ]
-            )
-        except ClientError as e:
-            logger.warning(f"Failed to send metric {metric_name}: {e}")
+        """Buffer a custom metric for the next batched CloudWatch call"""
+        await self._ensure_clients()
+        
+        self._metric_buffer.append({
+            'MetricName': metric_name,
+            'Value': value,
+            'Unit': unit,
+            'Timestamp': datetime.now(timezone.utc)
+        })
+        if len(self._metric_buffer) >= METRIC_BATCH_SIZE:
+            await self._flush_metrics()
+    
+    async def _flush_metrics(self):
+        """Send all buffered metrics to CloudWatch in as few requests as possible"""
+        if not self._metric_buffer:
+            return
+        
+        batch, self._metric_buffer = self._metric_buffer, []
+        for i in range(0, len(batch), METRIC_BATCH_SIZE):
+            chunk = batch[i:i + METRIC_BATCH_SIZE]
+            try:
+                await self.cloudwatch.put_metric_data(
+                    Namespace=METRIC_NAMESPACE,
+                    MetricData=chunk
+                )
+            except (ClientError, BotoCoreError) as e:
+                logger.warning(f"Failed to send {len(chunk)} metrics: {e}")
+    
+    async def _metrics_flusher(self):
+        """Periodically flush buffered metrics so partial batches are not delayed"""
+        while True:
+            await asyncio.sleep(METRIC_FLUSH_INTERVAL_SECONDS)
+            try:
+                await self._flush_metrics()
+            except Exception as e:
+                # A failed flush must not end the loop; later metrics still need sending
+                logger.error(f"Metric flush failed: {e}")
 
 class ErrorAggregator:
     """Aggregates and analyzes error fixing results"""
     
     def __init__(self, result_bucket: str, region: str = 'us-east-1'):
         self.result_bucket = result_bucket
-        self.s3 = boto3.client('s3', region_name=region)
+        self.region = region
+        self._session = get_session()
+        self._client_stack: Optional[AsyncExitStack] = None
+        self.s3 = None
+    
+    async def __aenter__(self) -> 'ErrorAggregator':
+        await self._ensure_client()
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def _ensure_client(self):
+        """Create the async S3 client on first use"""
+        if self.s3 is None:
+            stack = AsyncExitStack()
+            self.s3 = await stack.enter_async_context(
+                self._session.create_client('s3', region_name=self.region))
+            self._client_stack = stack
+    
+    async def close(self):
+        """Close the S3 client and release its connection pool"""
+        if self._client_stack is not None:
+            await self._client_stack.aclose()
+            self._client_stack = None
+            self.s3 = None
+    
+    async def _fetch_result(self, job_id: str, semaphore: asyncio.Semaphore) -> Optional[Dict[str, Any]]:
+        """Retrieve one job's result from S3, or None if it can't be read"""
+        async with semaphore:
+            try:
+                key = f"error-fixes/{job_id}.json"
+                response = await self.s3.get_object(Bucket=self.result_bucket, Key=key)
+                async with response['Body'] as stream:
+                    return orjson.loads(await stream.read())
+            except ClientError as e:
+                logger.warning(f"Could not retrieve result for job {job_id}: {e}")
+                return None
     
     async def aggregate_results(self, job_ids: List[str]) -> Dict[str, Any]:
         """
@@ -567,35 +885,41 @@ class ErrorAggregator:
         Returns:
             Aggregated results and statistics
         """
-        results = []
+        await self._ensure_client()
         
-        for job_id in job_ids:
-            try:
-                # Retrieve result from S3
-                key = f"error-fixes/{job_id}.json"
-                response = self.s3.get_object(Bucket=self.result_bucket, Key=key)
-                result_data = json.loads(response['Body'].read())
-                results.append(result_data)
-            except ClientError as e:
-                logger.warning(f"Could not retrieve result for job {job_id}: {e}")
+        # Retrieve results from S3 concurrently, capped to avoid flooding the connection pool
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_RESULT_FETCHES)
+        fetched = await asyncio.gather(*(self._fetch_result(job_id, semaphore) for job_id in job_ids))
+        results = [result for result in fetched if result is not None]
         
-        # Calculate statistics
+        # Calculate statistics in a single pass over the results
         total_jobs = len(job_ids)
-        successful_fixes = len([r for r in results if r.get('success', False)])
-        failed_fixes = total_jobs - successful_fixes
+        successful_fixes = 0
+        confidence_sum = 0.0
+        execution_time_sum = 0.0
+        type_counts: Dict[str, List[int]] = {}  # error_type -> [total, successful]
+        for result in results:
+            success = bool(result.get('success', False))
+            successful_fixes += success
+            confidence_sum += result.get('confidence_score', 0)
+            execution_time_sum += result.get('execution_time_ms', 0)
+            
+            error_type = result.get('error_type', 'unknown')
+            counts = type_counts.get(error_type)
+            if counts is None:
+                counts = type_counts[error_type] = [0, 0]
+            counts[0] += 1
+            counts[1] += success
         
-        avg_confidence = sum(r.get('confidence_score', 0) for r in results) / len(results) if results else 0
-        avg_execution_time = sum(r.get('execution_time_ms', 0) for r in results) / len(results) if results else 0
+        failed_fixes = total_jobs - successful_fixes
+        avg_confidence = confidence_sum / len(results) if results else 0
+        avg_execution_time = execution_time_sum / len(results) if results else 0
         
         # Group by error type
-        error_type_stats = {}
-        for result in results:
-            error_type = result.get('error_type', 'unknown')
-            if error_type not in error_type_stats:
-                error_type_stats[error_type] = {'total': 0, 'successful': 0}
-            error_type_stats[error_type]['total'] += 1
-            if result.get('success', False):
-                error_type_stats[error_type]['successful'] += 1
+        error_type_stats = {
+            error_type: {'total': total, 'successful': successful}
+            for error_type, (total, successful) in type_counts.items()
+        }
         
         return {
             'total_jobs': total_jobs,
@@ -630,26 +954,27 @@ if __name__ == "__main__":
     )
     
     async def main():
-        if args.action == 'distribute' and args.errors_file:
-            with open(args.errors_file, 'r') as f:
-                errors = json.load(f)
-            job_ids = await distributor.distribute_errors(errors)
-            print(f"Distributed {len(job_ids)} error fixing jobs")
-            for job_id in job_ids:
-                print(f"  - {job_id}")
-        
-        elif args.action == 'status':
-            if args.job_ids:
-                for job_id in args.job_ids:
-                    status = await distributor.get_job_status(job_id)
-                    print(f"Job {job_id}: {json.dumps(status, indent=2)}")
-            else:
-                stats = await distributor.get_queue_stats()
-                print(f"Queue stats: {json.dumps(stats, indent=2)}")
-        
-        elif args.action == 'aggregate' and args.job_ids:
-            aggregator = ErrorAggregator(args.bucket, args.region)
-            results = await aggregator.aggregate_results(args.job_ids)
-            print(f"Aggregated results: {json.dumps(results, indent=2)}")
+        async with distributor:
+            if args.action == 'distribute' and args.errors_file:
+                with open(args.errors_file, 'r') as f:
+                    errors = json.load(f)
+                job_ids = await distributor.distribute_errors(errors)
+                print(f"Distributed {len(job_ids)} error fixing jobs")
+                for job_id in job_ids:
+                    print(f"  - {job_id}")
+            
+            elif args.action == 'status':
+                if args.job_ids:
+                    for job_id in args.job_ids:
+                        status = await distributor.get_job_status(job_id)
+                        print(f"Job {job_id}: {json.dumps(status, indent=2)}")
+                else:
+                    stats = await distributor.get_queue_stats()
+                    print(f"Queue stats: {json.dumps(stats, indent=2)}")
+            
+            elif args.action == 'aggregate' and args.job_ids:
+                async with ErrorAggregator(args.bucket, args.region) as aggregator:
+                    results = await aggregator.aggregate_results(args.job_ids)
+                print(f"Aggregated results: {json.dumps(results, indent=2)}")
     
     asyncio.run(main()) 
\ No newline at end of file
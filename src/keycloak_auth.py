@@ -5,25 +5,61 @@ Integrates with PlannerDDF Keycloak instance for seamless authentication
 """
 
 import os
-import jwt
 import time
-import yaml
-import requests
-from typing import Dict, Optional, Tuple, Any
-from functools import wraps
+import hmac
+import hashlib
+import secrets
+import threading
+from urllib.parse import urlencode, quote
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import TLRUCache
+from typing import Dict, Optional, Tuple, Any, TYPE_CHECKING
+from functools import wraps, cached_property
 from flask import Flask, request, jsonify, g, redirect, session
-from datetime import datetime, timedelta
+from datetime import datetime
 import logging
+import orjson
+
+# jwt, yaml and requests are imported where they are first needed, so workers
+# that never see a Keycloak request do not pay for loading them
+if TYPE_CHECKING:
+    import requests
 
 logger = logging.getLogger(__name__)
 
+TOKEN_CACHE_SIZE = 10_000
+
+# (connect, read) timeouts for Keycloak calls, so a stalled server cannot hang a request
+HTTP_TIMEOUT = (3, 10)
+
+# Minimum gap between JWKS refreshes, so tokens with unknown key IDs cannot hammer Keycloak
+JWKS_MIN_REFRESH_SECONDS = 30
+
+class AuthenticationFailed(Exception):
+    """Keycloak rejected a token; the message is returned to the client"""
+    pass
+
+class KeycloakUnavailable(Exception):
+    """Keycloak could not be reached or answered with a server error"""
+    pass
+
 class KeycloakAuth:
     """Keycloak authentication integration for AI Testing Agent"""
     
     def __init__(self, config_path: str = "/app/config/auth/keycloak-integration-deployment.yml"):
         self.config = self._load_config(config_path)
         self.keycloak_config = self.config['keycloak']
-        self.token_cache = {}  # Cache for validated tokens
+        
+        # Cache for validated tokens: bounded, and entries expire at the earlier of
+        # cache_duration and the token's own exp. Expired entries are purged on every
+        # insertion, so tokens that are never seen again do not need a sweeper thread.
+        # Flask may serve requests from several threads, so access goes through the lock.
+        self._cache_duration = self.config.get('authentication', {}).get('keycloak', {}).get('cache_duration', 300)
+        self.token_cache = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=self._token_expiry, timer=time.monotonic)
+        # Last successful validation per token, kept until the token's own exp so that
+        # it can still be honoured while Keycloak is unreachable (guarded by the same lock)
+        self._last_known_claims = TLRUCache(maxsize=TOKEN_CACHE_SIZE, ttu=self._token_lifetime, timer=time.monotonic)
+        self._cache_lock = threading.RLock()
         
         # Build Keycloak URLs
         self.server_url = self.keycloak_config['server_url']
@@ -36,14 +72,76 @@ class KeycloakAuth:
         self.token_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/token"
         self.userinfo_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/userinfo"
         self.introspect_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/token/introspect"
+        self.certs_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/certs"
+        self.logout_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/logout"
+        
+        # Client credentials sent with every back-channel call
+        self._client_auth = {'client_id': self.client_id, 'client_secret': self.client_secret}
+        
+        self._required_roles = frozenset(self.keycloak_config.get('required_roles', []))
+        if not self._required_roles:
+            # Nothing to check; skip the role lookup on every request
+            self._check_required_roles = lambda user_info: True
+        
+        # Only the state parameter varies between logins
+        self._auth_url_base = f"{self.auth_url}?" + urlencode({
+            'client_id': self.client_id,
+            'redirect_uri': self.keycloak_config.get('redirect_uri', ''),
+            'response_type': 'code',
+            'scope': 'openid profile email'
+        })
+        
+        # Runs the userinfo GET alongside introspection for opaque tokens
+        self._userinfo_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix='keycloak-userinfo')
+        
+        # Realm signing keys (kid -> public key) for verifying JWT access tokens locally
+        self._jwks_cache: Dict[str, Any] = {}
+        self._jwks_fetched_at = 0.0
+        token_validation = self.keycloak_config.get('token_validation', {})
+        # Stock Keycloak access tokens name the client in azp and carry aud only when an
+        # audience mapper is configured, so aud is verified only if an audience is set
+        self._audience = token_validation.get('audience')
+        self._jwt_options = {
+            'require': ['exp', 'iat', 'sub', 'iss'] + (['aud'] if self._audience else []),
+            'verify_aud': bool(self._audience)
+        }
+        self._leeway = token_validation.get('leeway', 0)
+        self._issuer = f"{self.server_url}/auth/realms/{self.realm}"
         
         logger.info(f"Keycloak auth initialized for realm: {self.realm}")
     
+    @cached_property
+    def _session(self) -> 'requests.Session':
+        """HTTP session for Keycloak calls, created on first use
+        
+        Pooled keep-alive connections, so each call does not pay a fresh TCP + TLS handshake.
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+        
+        http = requests.Session()
+        http.verify = self.keycloak_config.get('verify_ssl', True)
+        adapter = HTTPAdapter(
+            pool_connections=20,
+            pool_maxsize=100,
+            max_retries=Retry(
+                total=3, backoff_factor=0.1, status_forcelist=[502, 503, 504],
+                raise_on_status=False  # Hand the final response back to the status checks below
+            )
+        )
+        http.mount('http://', adapter)
+        http.mount('https://', adapter)
+        return http
+    
     def _load_config(self, config_path: str) -> Dict[str, Any]:
         """Load Keycloak configuration"""
         try:
+            import yaml
+            # Prefer libyaml's C parser when available
+            loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
             with open(config_path, 'r') as f:
-                config = yaml.safe_load(f)
+                config = yaml.load(f, Loader=loader)
             
             # Apply environment-specific overrides
             env = os.getenv('ENVIRONMENT', 'development')
@@ -66,45 +164,44 @@ class KeycloakAuth:
             }
     
     def _merge_config(self, base: Dict, override: Dict) -> Dict:
-        """Merge configuration dictionaries"""
+        """Merge configuration dictionaries
+        
+        Works iteratively and only copies the dicts along overridden paths, so the
+        base config is never mutated.
+        """
         result = base.copy()
-        for key, value in override.items():
-            if isinstance(value, dict) and key in result:
-                result[key] = self._merge_config(result[key], value)
-            else:
-                result[key] = value
+        pending = [(result, override)]
+        while pending:
+            target, patch = pending.pop()
+            for key, value in patch.items():
+                current = target.get(key)
+                if isinstance(value, dict) and isinstance(current, dict):
+                    target[key] = current.copy()
+                    pending.append((target[key], value))
+                else:
+                    target[key] = value
         return result
     
     def get_auth_url(self, state: str = None) -> str:
         """Generate Keycloak authorization URL"""
-        params = {
-            'client_id': self.client_id,
-            'redirect_uri': self.keycloak_config['redirect_uri'],
-            'response_type': 'code',
-            'scope': 'openid profile email'
-        }
-        
         if state:
-            params['state'] = state
-        
-        query_string = '&'.join([f"{k}={v}" for k, v in params.items()])
-        return f"{self.auth_url}?{query_string}"
+            return f"{self._auth_url_base}&state={quote(state, safe='')}"
+        return self._auth_url_base
     
     def exchange_code_for_token(self, code: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
         """Exchange authorization code for access token"""
         try:
             data = {
+                **self._client_auth,
                 'grant_type': 'authorization_code',
-                'client_id': self.client_id,
-                'client_secret': self.client_secret,
                 'code': code,
                 'redirect_uri': self.keycloak_config['redirect_uri']
             }
             
-            response = requests.post(self.token_url, data=data)
+            response = self._session.post(self.token_url, data=data, timeout=HTTP_TIMEOUT)
             
             if response.status_code == 200:
-                token_data = response.json()
+                token_data = orjson.loads(response.content)
                 logger.info("Successfully exchanged code for token")
                 return True, token_data, None
             else:
@@ -118,81 +215,207 @@ class KeycloakAuth:
             return False, None, error_msg
     
     def validate_token(self, access_token: str) -> Tuple[bool, Optional[Dict], Optional[str]]:
-        """Validate access token with Keycloak"""
-        # Check cache first
-        cache_key = f"token_{access_token[:16]}"
-        if cache_key in self.token_cache:
-            cached_data = self.token_cache[cache_key]
-            if datetime.utcnow() < cached_data['expires_at']:
-                return True, cached_data['user_info'], None
-            else:
-                del self.token_cache[cache_key]
+        """Validate access token with Keycloak
         
+        Returns:
+            (valid, claims, error) where claims are the verified token claims
+            (or the userinfo response for opaque tokens)
+        """
+        # Check cache first (keyed by a digest of the whole token; JWT prefixes are shared)
+        cache_key = hashlib.blake2b(access_token.encode(), digest_size=16).digest()
+        with self._cache_lock:
+            claims = self.token_cache.get(cache_key)
+        if claims is not None:
+            return True, claims, None
+        
+        import jwt
         try:
-            # Introspect token
-            data = {
-                'token': access_token,
-                'client_id': self.client_id,
-                'client_secret': self.client_secret
-            }
+            claims = self._verified_claims(access_token)
             
-            response = requests.post(self.introspect_url, data=data)
+            # Check required roles
+            if not self._check_required_roles(claims):
+                return False, None, "Insufficient permissions"
             
-            if response.status_code == 200:
-                introspect_data = response.json()
-                
-                if not introspect_data.get('active', False):
-                    return False, None, "Token is not active"
-                
-                # Get user info
-                headers = {'Authorization': f'Bearer {access_token}'}
-                userinfo_response = requests.get(self.userinfo_url, headers=headers)
-                
-                if userinfo_response.status_code == 200:
-                    user_info = userinfo_response.json()
-                    
-                    # Check required roles
-                    if not self._check_required_roles(user_info):
-                        return False, None, "Insufficient permissions"
-                    
-                    # Cache the result
-                    cache_duration = self.config['authentication']['keycloak']['cache_duration']
-                    self.token_cache[cache_key] = {
-                        'user_info': user_info,
-                        'expires_at': datetime.utcnow() + timedelta(seconds=cache_duration)
-                    }
-                    
-                    logger.info(f"Token validated for user: {user_info.get('preferred_username')}")
-                    return True, user_info, None
-                else:
-                    return False, None, "Failed to get user info"
-            else:
-                return False, None, f"Token introspection failed: {response.status_code}"
-                
+            # Cache the result
+            with self._cache_lock:
+                self.token_cache[cache_key] = claims
+                self._last_known_claims[cache_key] = claims
+            
+            logger.info(f"Token validated for user: {claims.get('preferred_username')}")
+            return True, claims, None
+        
+        except jwt.InvalidTokenError as e:
+            return False, None, f"Invalid token: {str(e)}"
+        except AuthenticationFailed as e:
+            return False, None, str(e)
+        except KeycloakUnavailable as e:
+            # Serve a previous validation while the token itself is still unexpired
+            with self._cache_lock:
+                claims = self._last_known_claims.get(cache_key)
+            if claims is None:
+                logger.error(str(e))
+                return False, None, str(e)
+            logger.warning(f"{e}; using cached validation for user: {claims.get('preferred_username')}")
+            return True, claims, None
         except Exception as e:
             error_msg = f"Token validation error: {str(e)}"
             logger.error(error_msg)
             return False, None, error_msg
     
-    def _check_required_roles(self, user_info: Dict) -> bool:
-        """Check if user has required roles"""
-        required_roles = self.keycloak_config.get('required_roles', [])
-        if not required_roles:
-            return True
+    def _token_expiry(self, _key: bytes, claims: Dict, now: float) -> float:
+        """Cache expiry time for validated claims, never past the token's own exp
+        
+        Expiry is tracked on the monotonic clock; the wall clock is read only here,
+        once per insertion, to turn the token's exp into a remaining lifetime.
+        """
+        ttl = self._cache_duration
+        if 'exp' in claims:
+            ttl = min(ttl, claims['exp'] - time.time())
+        return now + ttl
+    
+    def _token_lifetime(self, _key: bytes, claims: Dict, now: float) -> float:
+        """Expiry time at the token's own exp; claims without exp are not kept"""
+        if 'exp' not in claims:
+            return now
+        return now + claims['exp'] - time.time()
+    
+    def _verified_claims(self, access_token: str) -> Dict:
+        """Verify a token and return its claims
+        
+        JWT access tokens are verified locally against the realm keys in a single
+        decode; only opaque tokens need the introspection round-trips.
+        
+        Raises:
+            jwt.InvalidTokenError: If JWT verification fails
+            AuthenticationFailed: If Keycloak rejects an opaque token
+            KeycloakUnavailable: If Keycloak is needed but cannot be reached
+        """
+        import jwt
+        signing_key = self._signing_key_for(access_token)
+        if signing_key is None:
+            return self._introspect_token(access_token)
+        
+        claims = jwt.decode(
+            access_token,
+            key=signing_key,
+            algorithms=['RS256'],
+            audience=self._audience,
+            issuer=self._issuer,
+            leeway=self._leeway,
+            options=self._jwt_options
+        )
+        if not self._audience and claims.get('azp') != self.client_id:
+            raise jwt.InvalidTokenError(f"Token was not issued to client {self.client_id}")
+        return claims
+    
+    def _signing_key_for(self, access_token: str) -> Optional[Any]:
+        """Realm public key that signed a JWT access token, or None for opaque tokens
+        
+        Raises:
+            jwt.InvalidTokenError: If the token is a JWT signed with an unknown key
+            KeycloakUnavailable: If the keys had to be refreshed and could not be
+        """
+        import jwt
+        try:
+            header = jwt.get_unverified_header(access_token)
+        except jwt.DecodeError:
+            return None
+        
+        kid = header.get('kid')
+        if kid not in self._jwks_cache:
+            # Keycloak rotated its keys (or we have not fetched them yet)
+            self._fetch_jwks()
+        try:
+            return self._jwks_cache[kid]
+        except KeyError:
+            raise jwt.InvalidTokenError(f"Unknown signing key: {kid}")
+    
+    def _fetch_jwks(self) -> None:
+        """Refresh the realm signing keys from Keycloak's JWKS endpoint
+        
+        Raises:
+            KeycloakUnavailable: If the keys cannot be fetched
+        """
+        import jwt
+        import requests
+        now = time.monotonic()
+        if self._jwks_cache and now - self._jwks_fetched_at < JWKS_MIN_REFRESH_SECONDS:
+            return
+        
+        try:
+            response = self._session.get(self.certs_url, timeout=HTTP_TIMEOUT)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            raise KeycloakUnavailable(f"Failed to fetch signing keys: {e}") from e
+        
+        keys = {}
+        for jwk in orjson.loads(response.content).get('keys', []):
+            if jwk.get('use', 'sig') == 'sig' and jwk.get('kty') == 'RSA':
+                keys[jwk['kid']] = jwt.PyJWK(jwk).key
+        
+        self._jwks_cache = keys
+        self._jwks_fetched_at = now
+        logger.info(f"Loaded {len(keys)} signing keys for realm: {self.realm}")
+    
+    def _introspect_token(self, access_token: str) -> Dict:
+        """Validate an opaque token via introspection and return the user info
+        
+        The returned claims carry the token's exp from the introspection response.
         
-        user_roles = []
+        Raises:
+            AuthenticationFailed: If Keycloak rejects the token
+            KeycloakUnavailable: If Keycloak cannot be reached or returns a server error
+        """
+        import requests
+        data = dict(self._client_auth, token=access_token)
         
-        # Extract roles from different possible locations
-        realm_access = user_info.get('realm_access', {})
-        if 'roles' in realm_access:
-            user_roles.extend(realm_access['roles'])
+        # Fetch user info concurrently so the two round-trips overlap; it is
+        # discarded if introspection rejects the token
+        headers = {'Authorization': f'Bearer {access_token}'}
+        userinfo_future = self._userinfo_executor.submit(
+            self._session.get, self.userinfo_url, headers=headers, timeout=HTTP_TIMEOUT
+        )
         
-        # Check if user has any of the required roles
-        for role in required_roles:
-            if role in user_roles:
-                return True
+        try:
+            response = self._session.post(self.introspect_url, data=data, timeout=HTTP_TIMEOUT)
+        except requests.RequestException as e:
+            raise KeycloakUnavailable(f"Token introspection failed: {e}") from e
+        
+        if response.status_code >= 500:
+            raise KeycloakUnavailable(f"Token introspection failed: {response.status_code}")
+        if response.status_code != 200:
+            raise AuthenticationFailed(f"Token introspection failed: {response.status_code}")
+        
+        introspect_data = orjson.loads(response.content)
         
-        logger.warning(f"User {user_info.get('preferred_username')} lacks required roles: {required_roles}")
+        if not introspect_data.get('active', False):
+            raise AuthenticationFailed("Token is not active")
+        
+        try:
+            userinfo_response = userinfo_future.result()
+        except requests.RequestException as e:
+            raise KeycloakUnavailable(f"Failed to get user info: {e}") from e
+        
+        if userinfo_response.status_code >= 500:
+            raise KeycloakUnavailable(f"Failed to get user info: {userinfo_response.status_code}")
+        if userinfo_response.status_code != 200:
+            raise AuthenticationFailed("Failed to get user info")
+        
+        user_info = orjson.loads(userinfo_response.content)
+        if 'exp' in introspect_data:
+            user_info.setdefault('exp', introspect_data['exp'])
+        return user_info
+    
+    def _check_required_roles(self, user_info: Dict) -> bool:
+        """Check if user has any of the required roles
+        
+        Replaced by an always-true check in __init__ when no roles are required.
+        """
+        roles = user_info.get('realm_access', {}).get('roles', ())
+        if not self._required_roles.isdisjoint(roles):
+            return True
+        
+        logger.warning(f"User {user_info.get('preferred_username')} lacks required roles: {sorted(self._required_roles)}")
         return False
     
     def authenticate_request(self) -> Tuple[bool, Optional[str], Optional[Dict]]:
@@ -200,19 +423,19 @@ class KeycloakAuth:
         # Check for Bearer token in Authorization header
         auth_header = request.headers.get('Authorization', '')
         
-        if not auth_header.startswith('Bearer '):
+        access_token = auth_header.removeprefix('Bearer ')
+        if len(access_token) == len(auth_header):  # No Bearer prefix was removed
             return False, "Missing or invalid Authorization header", None
         
-        access_token = auth_header.split(' ', 1)[1]
-        
         # Validate token with Keycloak
-        valid, user_info, error = self.validate_token(access_token)
+        valid, claims, error = self.validate_token(access_token)
         
         if valid:
+            # The request user is built straight from the verified claims
             return True, None, {
-                'user_id': user_info.get('preferred_username'),
-                'email': user_info.get('email'),
-                'roles': user_info.get('realm_access', {}).get('roles', []),
+                'user_id': claims.get('preferred_username'),
+                'email': claims.get('email'),
+                'roles': claims.get('realm_access', {}).get('roles', []),
                 'method': 'keycloak'
             }
         else:
@@ -222,14 +445,8 @@ class KeycloakAuth:
         """Logout user from Keycloak"""
         try:
             if refresh_token:
-                data = {
-                    'client_id': self.client_id,
-                    'client_secret': self.client_secret,
-                    'refresh_token': refresh_token
-                }
-                
-                logout_url = f"{self.server_url}/auth/realms/{self.realm}/protocol/openid-connect/logout"
-                response = requests.post(logout_url, data=data)
+                data = dict(self._client_auth, refresh_token=refresh_token)
+                response = self._session.post(self.logout_url, data=data, timeout=HTTP_TIMEOUT)
                 
                 return response.status_code == 204
             
@@ -245,7 +462,7 @@ def setup_keycloak_routes(app: Flask, keycloak_auth: KeycloakAuth):
     @app.route('/auth/keycloak/login')
     def keycloak_login():
         """Initiate Keycloak login"""
-        state = os.urandom(16).hex()
+        state = secrets.token_hex(16)
         session['oauth_state'] = state
         
         auth_url = keycloak_auth.get_auth_url(state)
@@ -258,7 +475,8 @@ def setup_keycloak_routes(app: Flask, keycloak_auth: KeycloakAuth):
         state = request.args.get('state')
         
         # Verify state parameter
-        if state != session.get('oauth_state'):
+        expected_state = session.get('oauth_state') or ''
+        if not state or not hmac.compare_digest(state.encode(), expected_state.encode()):
             return jsonify({'error': 'Invalid state parameter'}), 400
         
         if not code:
@@ -324,7 +542,7 @@ def create_keycloak_auth_decorator(keycloak_auth: KeycloakAuth):
 # Example usage
 if __name__ == "__main__":
     app = Flask(__name__)
-    app.secret_key = os.urandom(24)
+    app.secret_key = secrets.token_bytes(24)
     
     keycloak_auth = KeycloakAuth()
     setup_keycloak_routes(app, keycloak_auth)
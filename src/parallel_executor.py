@@ -4,16 +4,34 @@ Manages different test execution strategies across distributed instances
 """
 
 import asyncio
+import functools
 import logging
+import random
+import re
 import time
-from typing import List, Dict, Any, Optional, Callable
+import uuid
+import weakref
+from collections import defaultdict, deque
+from typing import List, Dict, Any, Optional, Callable, Iterable
 from dataclasses import dataclass
 from enum import Enum
-import concurrent.futures
 from distributed_coordinator import TestJob, TestResult, DistributedTestCoordinator
 
 logger = logging.getLogger(__name__)
 
+# Added lines of a unified diff ('+' but not the '+++' file header), captured without the prefix
+ADDED_LINE_PATTERN = re.compile(r'^\+(?!\+\+)(.*)$', re.MULTILINE)
+
+# Upper bound on progress callbacks per run (plus the final one), so large suites do not
+# pay an await and a callback for every single job
+PROGRESS_REPORTS_PER_RUN = 200
+
+# Result dispatcher polling for jobs completed by other instances: the delay starts
+# short and backs off (with jitter) towards the cap while jobs keep running
+RESULT_POLL_INITIAL_DELAY_SECONDS = 0.1
+RESULT_POLL_MAX_DELAY_SECONDS = 5.0
+RESULT_POLL_BACKOFF_FACTOR = 1.5
+
 class ExecutionStrategy(Enum):
     """Test execution strategies"""
     SEQUENTIAL = "sequential"
@@ -22,7 +40,7 @@ class ExecutionStrategy(Enum):
     HYBRID = "hybrid"
     LOAD_BALANCED = "load_balanced"
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionConfig:
     """Configuration for test execution"""
     strategy: ExecutionStrategy
@@ -36,7 +54,7 @@ class ExecutionConfig:
         if self.priority_levels is None:
             self.priority_levels = [1, 2, 3]  # High, Medium, Low
 
-@dataclass
+@dataclass(slots=True)
 class ExecutionResult:
     """Result of parallel execution"""
     total_jobs: int
@@ -61,10 +79,43 @@ class ParallelTestExecutor:
         """
         self.coordinator = coordinator
         self.config = config
-        self.active_executions: Dict[str, asyncio.Task] = {}
+        # Running executions by ID; entries drop out when their task finishes (or is collected)
+        self.active_executions: Dict[str, asyncio.Task] = weakref.WeakValueDictionary()
+        
+        # Completion futures of awaited jobs, resolved by the coordinator's completion
+        # hook (jobs finished in this process) or by one shared status poller (the rest).
+        # close() removes the hook again.
+        self._pending: Dict[str, asyncio.Future] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._result_poll_delay = RESULT_POLL_INITIAL_DELAY_SECONDS
+        coordinator.add_completion_listener(self._on_job_completed)
+        
+        # Execution method per strategy
+        self._strategies = {
+            ExecutionStrategy.SEQUENTIAL: self._execute_sequential,
+            ExecutionStrategy.PARALLEL_FILES: self._execute_parallel_files,
+            ExecutionStrategy.PARALLEL_FUNCTIONS: self._execute_parallel_functions,
+            ExecutionStrategy.HYBRID: self._execute_hybrid,
+            ExecutionStrategy.LOAD_BALANCED: self._execute_load_balanced
+        }
+        
+        # Hybrid strategy per job priority: high priority runs sequentially for reliability,
+        # medium in parallel batches, any other priority (None) with maximum parallelism
+        self._hybrid_strategies = {
+            1: (self._execute_sequential, 'sequentially'),
+            2: (self._execute_parallel_files, 'in parallel'),
+            None: (self._execute_parallel_functions, 'with max parallelism')
+        }
         
         logger.info(f"Initialized ParallelTestExecutor with strategy: {config.strategy}")
     
+    def close(self):
+        """Detach from the coordinator, so a long-lived coordinator does not keep this executor alive"""
+        try:
+            self.coordinator.remove_completion_listener(self._on_job_completed)
+        except ValueError:
+            pass  # Already closed
+    
     async def execute_test_suite(self, 
                                 jobs: List[TestJob], 
                                 progress_callback: Optional[Callable] = None) -> ExecutionResult:
@@ -78,32 +129,37 @@ class ParallelTestExecutor:
         Returns:
             ExecutionResult with comprehensive metrics
         """
-        start_time = time.time()
+        start_time = time.perf_counter()
         
-        logger.info(f"Starting execution of {len(jobs)} jobs using {self.config.strategy.value} strategy")
+        execution_id = uuid.uuid4().hex
+        logger.info(f"Starting execution {execution_id} of {len(jobs)} jobs using {self.config.strategy.value} strategy")
         
         # Choose execution strategy
-        if self.config.strategy == ExecutionStrategy.SEQUENTIAL:
-            results = await self._execute_sequential(jobs, progress_callback)
-        elif self.config.strategy == ExecutionStrategy.PARALLEL_FILES:
-            results = await self._execute_parallel_files(jobs, progress_callback)
-        elif self.config.strategy == ExecutionStrategy.PARALLEL_FUNCTIONS:
-            results = await self._execute_parallel_functions(jobs, progress_callback)
-        elif self.config.strategy == ExecutionStrategy.HYBRID:
-            results = await self._execute_hybrid(jobs, progress_callback)
-        elif self.config.strategy == ExecutionStrategy.LOAD_BALANCED:
-            results = await self._execute_load_balanced(jobs, progress_callback)
-        else:
+        execute = self._strategies.get(self.config.strategy)
+        if execute is None:
             raise ValueError(f"Unknown execution strategy: {self.config.strategy}")
         
-        end_time = time.time()
+        if progress_callback:
+            progress_callback = self._coalesce_progress(progress_callback, len(jobs))
+        
+        # Run as its own task so cancel_execution stops this run without touching the caller
+        task = asyncio.create_task(execute(jobs, progress_callback))
+        self.track_execution(execution_id, task)
+        results = await task
+        
+        end_time = time.perf_counter()
         execution_time_ms = int((end_time - start_time) * 1000)
         
-        # Calculate metrics
-        completed_jobs = len([r for r in results if r.success])
-        failed_jobs = len([r for r in results if not r.success])
+        # Calculate metrics in a single pass over the results
+        completed_jobs = 0
+        total_job_time = 0
+        for r in results:
+            if r.success:
+                completed_jobs += 1
+            total_job_time += r.execution_time_ms
+        failed_jobs = len(results) - completed_jobs
         
-        average_job_time = sum(r.execution_time_ms for r in results) / len(results) if results else 0
+        average_job_time = total_job_time / len(results) if results else 0
         throughput = len(results) / (execution_time_ms / 1000) if execution_time_ms > 0 else 0
         error_rate = (failed_jobs / len(results) * 100) if results else 0
         
@@ -123,6 +179,24 @@ class ParallelTestExecutor:
         
         return execution_result
     
+    @staticmethod
+    def _coalesce_progress(progress_callback: Callable, total: int) -> Callable:
+        """
+        Wrap a progress callback so it fires about PROGRESS_REPORTS_PER_RUN times per run
+        
+        The report for the last job is always delivered.
+        """
+        step = max(1, total // PROGRESS_REPORTS_PER_RUN)
+        next_report = step
+        
+        async def report(completed: int, total: int, result: Optional[TestResult]):
+            nonlocal next_report
+            if completed >= next_report or completed == total:
+                next_report = completed + step
+                await progress_callback(completed, total, result)
+        
+        return report
+    
     async def _execute_sequential(self, 
                                  jobs: List[TestJob], 
                                  progress_callback: Optional[Callable] = None) -> List[TestResult]:
@@ -136,175 +210,245 @@ class ParallelTestExecutor:
                 # Submit job and wait for completion
                 message_id = await self.coordinator.submit_test_job(job)
                 result = await self._wait_for_job_completion(job.id)
-                results.append(result)
-                
-                if progress_callback:
-                    await progress_callback(i + 1, len(jobs), result)
-                    
             except Exception as e:
                 logger.error(f"Failed to execute job {job.id}: {e}")
                 # Create failure result
-                failure_result = TestResult(
-                    job_id=job.id,
-                    success=False,
-                    tests_generated=0,
-                    tests_passed=0,
-                    tests_failed=0,
-                    coverage_percentage=0.0,
-                    execution_time_ms=0,
-                    error_message=str(e)
-                )
-                results.append(failure_result)
+                result = TestResult.failure(job.id, str(e))
+            
+            results.append(result)
+            if progress_callback:
+                await progress_callback(i + 1, len(jobs), result)
         
         return results
     
     async def _execute_parallel_files(self, 
                                      jobs: List[TestJob], 
                                      progress_callback: Optional[Callable] = None) -> List[TestResult]:
-        """Execute jobs in parallel batches (file-level parallelism)"""
+        """
+        Execute jobs in parallel batches (file-level parallelism)
+        
+        The next batch is submitted while the current one's results are awaited,
+        so the queue is not left idle between batches; at most two batches are
+        in flight at a time. Its completion futures are registered before it is
+        sent, so jobs that finish before they are awaited are not missed.
+        
+        The batch size starts at config.batch_size and ratchets with observed
+        throughput: it grows while batches get faster and shrinks when they
+        slow down, within [batch_size // 2, max_workers * 4]. Throughput is
+        measured from a batch's first result to its last, so time spent waiting
+        for the batch to be submitted and started does not count against it.
+        """
         results = []
         
-        # Process jobs in batches
-        for batch_start in range(0, len(jobs), self.config.batch_size):
-            batch_end = min(batch_start + self.config.batch_size, len(jobs))
-            batch = jobs[batch_start:batch_end]
-            
-            logger.info(f"Processing batch {batch_start//self.config.batch_size + 1}: "
-                       f"jobs {batch_start+1}-{batch_end}")
-            
-            # Submit all jobs in batch
-            submission_tasks = []
-            for job in batch:
-                task = asyncio.create_task(self.coordinator.submit_test_job(job))
-                submission_tasks.append(task)
-            
-            # Wait for all submissions
-            message_ids = await asyncio.gather(*submission_tasks, return_exceptions=True)
-            
-            # Wait for all completions
-            completion_tasks = []
-            for job in batch:
-                task = asyncio.create_task(self._wait_for_job_completion(job.id))
-                completion_tasks.append(task)
-            
-            batch_results = await asyncio.gather(*completion_tasks, return_exceptions=True)
-            
-            # Process results
-            for i, result in enumerate(batch_results):
-                if isinstance(result, Exception):
-                    logger.error(f"Job {batch[i].id} failed: {result}")
-                    failure_result = TestResult(
-                        job_id=batch[i].id,
-                        success=False,
-                        tests_generated=0,
-                        tests_passed=0,
-                        tests_failed=0,
-                        coverage_percentage=0.0,
-                        execution_time_ms=0,
-                        error_message=str(result)
-                    )
-                    results.append(failure_result)
-                else:
+        batch_size = self.config.batch_size
+        min_batch_size = max(batch_size // 2, 1)
+        max_batch_size = max(batch_size, self.config.max_workers * 4)
+        best_throughput = 0.0
+        
+        batch_number, batch_start = 1, 0
+        batch = jobs[:batch_size]
+        submission = asyncio.create_task(self._submit_batch(batch)) if batch else None
+        
+        try:
+            while batch:
+                logger.info(f"Processing batch {batch_number}: "
+                           f"jobs {batch_start+1}-{batch_start+len(batch)}")
+                
+                message_ids, submit_error = await submission
+                
+                next_start = batch_start + len(batch)
+                next_batch = jobs[next_start:next_start + batch_size]
+                submission = asyncio.create_task(self._submit_batch(next_batch)) if next_batch else None
+                
+                # Jobs the queue did not accept fail straight away
+                completions = []
+                for job in batch:
+                    if job.id in message_ids:
+                        completions.append(self._completion_or_failure(job.id))
+                        continue
+                    
+                    logger.error(f"Job {job.id} failed: {submit_error}")
+                    results.append(TestResult.failure(job.id, submit_error))
+                    if progress_callback:
+                        await progress_callback(len(results), len(jobs), results[-1])
+                
+                # Report each result as it arrives, so fast jobs are not held back by the slowest in the batch
+                first_result_at = None
+                for completion in asyncio.as_completed(completions):
+                    result = await completion
                     results.append(result)
-            
-            if progress_callback:
-                await progress_callback(len(results), len(jobs), batch_results[-1] if batch_results else None)
+                    if first_result_at is None:
+                        first_result_at = time.perf_counter()
+                    
+                    if progress_callback:
+                        await progress_callback(len(results), len(jobs), result)
+                
+                # Ratchet the size of the batches still to be submitted on this batch's throughput
+                # (results after the first, over the time since the first arrived)
+                if len(completions) > 1:
+                    throughput = (len(completions) - 1) / max(time.perf_counter() - first_result_at, 1e-6)
+                    if throughput > best_throughput * 1.05:
+                        batch_size = min(max(batch_size * 3 // 2, batch_size + 1), max_batch_size)
+                    elif throughput < best_throughput * 0.9:
+                        batch_size = max(batch_size * 2 // 3, min_batch_size)
+                    best_throughput = max(best_throughput, throughput)
+                
+                batch_number, batch_start, batch = batch_number + 1, next_start, next_batch
+        finally:
+            if submission is not None and not submission.done():
+                submission.cancel()
+            # Only futures of jobs left unawaited by an aborted run remain
+            self._drop_waiters(job.id for job in jobs)
         
         return results
     
+    async def _submit_batch(self, batch: List[TestJob]):
+        """
+        Submit a batch with SendMessageBatch (10 jobs per SQS call)
+        
+        Completion futures are registered first, so results that arrive before
+        _wait_for_job_completion is called for a job are kept for it.
+        
+        Returns:
+            Tuple of (message IDs by accepted job ID, error for the jobs not accepted)
+        """
+        self._register_waiters(job.id for job in batch)
+        try:
+            message_ids = await self.coordinator.submit_test_jobs(batch)
+            error = "Job submission rejected by the queue"
+        except Exception as e:
+            logger.error(f"Failed to submit batch: {e}")
+            message_ids, error = {}, str(e)
+        except BaseException:
+            self._drop_waiters(job.id for job in batch)
+            raise
+        
+        self._drop_waiters(job.id for job in batch if job.id not in message_ids)
+        return message_ids, error
+    
+    async def _completion_or_failure(self, job_id: str) -> TestResult:
+        """Wait for a submitted job's result; failures become a failed TestResult"""
+        try:
+            return await self._wait_for_job_completion(job_id)
+        except Exception as e:
+            logger.error(f"Job {job_id} failed: {e}")
+            return TestResult.failure(job_id, str(e))
+    
     async def _execute_parallel_functions(self, 
                                          jobs: List[TestJob], 
                                          progress_callback: Optional[Callable] = None) -> List[TestResult]:
-        """Execute jobs with function-level parallelism (fine-grained)"""
-        semaphore = asyncio.Semaphore(self.config.max_workers)
-        
-        async def execute_single_job(job: TestJob) -> TestResult:
-            async with semaphore:
-                try:
-                    message_id = await self.coordinator.submit_test_job(job)
-                    result = await self._wait_for_job_completion(job.id)
-                    return result
-                except Exception as e:
-                    logger.error(f"Failed to execute job {job.id}: {e}")
-                    return TestResult(
-                        job_id=job.id,
-                        success=False,
-                        tests_generated=0,
-                        tests_passed=0,
-                        tests_failed=0,
-                        coverage_percentage=0.0,
-                        execution_time_ms=0,
-                        error_message=str(e)
-                    )
-        
-        # Create tasks for all jobs
-        tasks = [asyncio.create_task(execute_single_job(job)) for job in jobs]
-        
-        # Wait for completion with progress tracking
+        """
+        Execute jobs with function-level parallelism (fine-grained)
+        
+        A fixed pool of max_workers workers drains a job queue, so only
+        max_workers jobs are in flight (and alive as coroutines) at a time.
+        Results are reported in completion order.
+        """
+        pending: asyncio.Queue = asyncio.Queue()
+        for job in jobs:
+            pending.put_nowait(job)
+        finished: asyncio.Queue = asyncio.Queue()
+        
+        async def worker():
+            while not pending.empty():
+                job = pending.get_nowait()
+                finished.put_nowait(await self._execute_single_job(job))
+        
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.config.max_workers, len(jobs)))]
+        return await self._collect_results(finished, len(jobs), workers, progress_callback)
+    
+    async def _collect_results(self,
+                               finished: asyncio.Queue,
+                               total: int,
+                               workers: List[asyncio.Task],
+                               progress_callback: Optional[Callable] = None) -> List[TestResult]:
+        """Collect total results from workers as they finish them, with progress tracking"""
         results = []
-        for i, task in enumerate(asyncio.as_completed(tasks)):
-            result = await task
-            results.append(result)
-            
-            if progress_callback:
-                await progress_callback(i + 1, len(jobs), result)
+        try:
+            for i in range(total):
+                result = await finished.get()
+                results.append(result)
+                
+                if progress_callback:
+                    await progress_callback(i + 1, total, result)
+        finally:
+            for task in workers:
+                task.cancel()
         
         return results
     
+    async def _execute_single_job(self, job: TestJob) -> TestResult:
+        """Submit one job and wait for its result; failures become a failed TestResult"""
+        try:
+            await self.coordinator.submit_test_job(job)
+            return await self._wait_for_job_completion(job.id)
+        except Exception as e:
+            logger.error(f"Failed to execute job {job.id}: {e}")
+            return TestResult.failure(job.id, str(e))
+    
     async def _execute_hybrid(self, 
                              jobs: List[TestJob], 
                              progress_callback: Optional[Callable] = None) -> List[TestResult]:
         """Execute jobs using hybrid strategy (priority-based)"""
         # Separate jobs by priority
-        priority_groups = {}
+        priority_groups = defaultdict(list)
         for job in jobs:
-            priority = job.priority
-            if priority not in priority_groups:
-                priority_groups[priority] = []
-            priority_groups[priority].append(job)
+            priority_groups[job.priority].append(job)
         
         results = []
         
-        # Process high priority jobs first (sequential for reliability)
-        if 1 in priority_groups:  # High priority
-            logger.info(f"Processing {len(priority_groups[1])} high-priority jobs sequentially")
-            high_priority_results = await self._execute_sequential(priority_groups[1])
-            results.extend(high_priority_results)
-        
-        # Process medium priority jobs in parallel
-        if 2 in priority_groups:  # Medium priority
-            logger.info(f"Processing {len(priority_groups[2])} medium-priority jobs in parallel")
-            medium_priority_results = await self._execute_parallel_files(priority_groups[2])
-            results.extend(medium_priority_results)
-        
-        # Process low priority jobs with maximum parallelism
-        if 3 in priority_groups:  # Low priority
-            logger.info(f"Processing {len(priority_groups[3])} low-priority jobs with max parallelism")
-            low_priority_results = await self._execute_parallel_functions(priority_groups[3])
-            results.extend(low_priority_results)
+        # Highest priority (lowest number) first
+        for priority in sorted(priority_groups):
+            group = priority_groups[priority]
+            execute, mode = self._hybrid_strategies.get(priority, self._hybrid_strategies[None])
+            logger.info(f"Processing {len(group)} priority-{priority} jobs {mode}")
+            results.extend(await execute(group))
         
         return results
     
     async def _execute_load_balanced(self, 
                                     jobs: List[TestJob], 
                                     progress_callback: Optional[Callable] = None) -> List[TestResult]:
-        """Execute jobs with dynamic load balancing"""
-        # Monitor queue stats and adjust strategy dynamically
-        queue_stats = await self.coordinator.get_queue_stats()
+        """
+        Execute jobs with dynamic load balancing
         
-        # Determine optimal strategy based on current load
+        Jobs are dealt round-robin onto one deque per worker. Each worker takes
+        from the front of its own deque and, once that is empty, steals from the
+        back of a random busy worker's deque, so uneven job durations do not
+        leave workers idle while others still have a backlog.
+        """
+        # Size the pool from the current queue load
+        queue_stats = await self.coordinator.get_queue_stats()
         if queue_stats.get('messages_available', 0) > 50:
-            # High queue load - use sequential to avoid overwhelming
-            logger.info("High queue load detected, using sequential execution")
-            return await self._execute_sequential(jobs, progress_callback)
+            # High queue load - a single worker to avoid overwhelming it
+            logger.info("High queue load detected, using a single worker")
+            worker_count = 1
         elif queue_stats.get('messages_in_flight', 0) < 10:
             # Low load - use maximum parallelism
-            logger.info("Low queue load detected, using parallel functions execution")
-            return await self._execute_parallel_functions(jobs, progress_callback)
+            logger.info("Low queue load detected, using all workers")
+            worker_count = self.config.max_workers
         else:
-            # Medium load - use parallel files
-            logger.info("Medium queue load detected, using parallel files execution")
-            return await self._execute_parallel_files(jobs, progress_callback)
+            logger.info("Medium queue load detected, using half the workers")
+            worker_count = max(1, self.config.max_workers // 2)
+        worker_count = min(worker_count, len(jobs))
+        
+        queues = [deque(jobs[i::worker_count]) for i in range(worker_count)]
+        finished: asyncio.Queue = asyncio.Queue()
+        
+        # Deques are only touched between awaits on the event loop thread, so they need no locks
+        async def worker(own: deque):
+            while True:
+                if own:
+                    job = own.popleft()
+                else:
+                    victims = [queue for queue in queues if queue]
+                    if not victims:
+                        return
+                    job = random.choice(victims).pop()
+                finished.put_nowait(await self._execute_single_job(job))
+        
+        workers = [asyncio.create_task(worker(queue)) for queue in queues]
+        return await self._collect_results(finished, len(jobs), workers, progress_callback)
     
     async def _wait_for_job_completion(self, job_id: str, timeout_seconds: int = None) -> TestResult:
         """
@@ -320,29 +464,101 @@ class ParallelTestExecutor:
         if timeout_seconds is None:
             timeout_seconds = self.config.timeout_seconds
         
-        start_time = time.time()
+        future = self._pending.get(job_id)
+        if future is None:
+            future = self._pending[job_id] = asyncio.get_running_loop().create_future()
+            # A new job may finish soon; do not make it wait out the backed-off interval
+            self._result_poll_delay = RESULT_POLL_INITIAL_DELAY_SECONDS
+        if self._dispatcher is None:
+            self._dispatcher = asyncio.create_task(self._dispatch_results())
+        
+        try:
+            return await asyncio.wait_for(future, timeout_seconds)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Job {job_id} did not complete within {timeout_seconds} seconds") from None
+        finally:
+            if self._pending.get(job_id) is future:
+                del self._pending[job_id]
+    
+    def _register_waiters(self, job_ids: Iterable[str]):
+        """Create completion futures for jobs about to be submitted"""
+        loop = asyncio.get_running_loop()
+        for job_id in job_ids:
+            if job_id not in self._pending:
+                self._pending[job_id] = loop.create_future()
+        self._result_poll_delay = RESULT_POLL_INITIAL_DELAY_SECONDS
+    
+    def _drop_waiters(self, job_ids: Iterable[str]):
+        """Discard completion futures that will not be awaited"""
+        for job_id in job_ids:
+            future = self._pending.pop(job_id, None)
+            if future is not None and not future.done():
+                future.cancel()
+    
+    def _on_job_completed(self, result: TestResult):
+        """Coordinator completion hook: wake the waiter for this job, if any"""
+        future = self._pending.get(result.job_id)
+        if future is not None and not future.done():
+            future.set_result(result)
+    
+    async def _dispatch_results(self):
+        """
+        Resolve pending completion futures for jobs finished elsewhere
         
-        while time.time() - start_time < timeout_seconds:
-            status = await self.coordinator.get_job_status(job_id)
-            
-            if status['status'] == 'completed':
-                return TestResult(**status['result'])
-            elif status['status'] == 'not_found':
-                # Job might not be processed yet, continue waiting
-                pass
-            
-            # Wait before checking again
-            await asyncio.sleep(1)
+        One loop checks all awaited jobs for a stored result, instead of every
+        waiter polling on its own; the interval backs off exponentially (with
+        jitter) so long-running jobs do not cost a lookup per second, and starts
+        over whenever a new job is awaited. It exits once nothing is pending.
+        """
+        try:
+            while self._pending:
+                delay = self._result_poll_delay
+                await asyncio.sleep(delay + random.uniform(0, delay * 0.2))
+                self._result_poll_delay = min(self._result_poll_delay * RESULT_POLL_BACKOFF_FACTOR,
+                                              RESULT_POLL_MAX_DELAY_SECONDS)
+                
+                job_ids = [job_id for job_id, future in self._pending.items() if not future.done()]
+                outcomes = await asyncio.gather(
+                    *(self.coordinator.get_completed_result(job_id) for job_id in job_ids),
+                    return_exceptions=True
+                )
+                
+                errors = []
+                for job_id, outcome in zip(job_ids, outcomes):
+                    future = self._pending.get(job_id)
+                    if future is None or future.done():
+                        continue
+                    if isinstance(outcome, Exception):
+                        # Lookup failures are usually transient and the job is still queued:
+                        # keep waiting, only the wait timeout fails a job
+                        errors.append(outcome)
+                    elif outcome is not None:
+                        future.set_result(outcome)
+                if errors:
+                    logger.warning(f"Failed to look up {len(errors)} job result(s), retrying: {errors[0]}")
+        finally:
+            self._dispatcher = None
+    
+    def track_execution(self, execution_id: str, task: asyncio.Task):
+        """
+        Register a running execution so it can be cancelled by ID
         
-        # Timeout reached
-        raise TimeoutError(f"Job {job_id} did not complete within {timeout_seconds} seconds")
+        Args:
+            execution_id: Identifier to cancel the execution by
+            task: Task running the execution; it is untracked when it finishes
+        """
+        self.active_executions[execution_id] = task
+        task.add_done_callback(functools.partial(self._on_execution_done, execution_id))
+    
+    def _on_execution_done(self, execution_id: str, task: asyncio.Task):
+        if self.active_executions.get(execution_id) is task:
+            del self.active_executions[execution_id]
     
     async def cancel_execution(self, execution_id: str):
         """Cancel an active execution"""
-        if execution_id in self.active_executions:
-            task = self.active_executions[execution_id]
+        task = self.active_executions.pop(execution_id, None)
+        if task is not None:
             task.cancel()
-            del self.active_executions[execution_id]
             logger.info(f"Cancelled execution {execution_id}")
     
     async def get_execution_stats(self) -> Dict[str, Any]:
@@ -365,6 +581,9 @@ class TestSuiteBuilder:
         """
         Create test jobs from a list of file paths
         
+        Reads the files one after another; from async code use
+        from_file_list_async so the event loop is not blocked.
+        
         Args:
             file_paths: List of file paths to create tests for
             language: Programming language
@@ -373,26 +592,53 @@ class TestSuiteBuilder:
         Returns:
             List of TestJob instances
         """
-        jobs = []
-        
-        for i, file_path in enumerate(file_paths):
-            try:
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    code = f.read()
-                
-                job = TestJob(
-                    id=f"file-{i}-{int(time.time())}",
-                    code=code,
-                    language=language,
-                    test_type=test_type,
-                    priority=1  # Default priority
-                )
-                jobs.append(job)
-                
-            except Exception as e:
-                logger.warning(f"Failed to read file {file_path}: {e}")
+        sources = [TestSuiteBuilder._read_source(file_path) for file_path in file_paths]
+        return TestSuiteBuilder._jobs_from_sources(sources, language, test_type)
+    
+    @staticmethod
+    async def from_file_list_async(file_paths: List[str], 
+                                   language: str = "javascript",
+                                   test_type: str = "unit") -> List[TestJob]:
+        """
+        Create test jobs from a list of file paths, reading the files concurrently
         
-        return jobs
+        Args:
+            file_paths: List of file paths to create tests for
+            language: Programming language
+            test_type: Type of tests to generate
+            
+        Returns:
+            List of TestJob instances
+        """
+        sources = await asyncio.gather(
+            *(asyncio.to_thread(TestSuiteBuilder._read_source, file_path) for file_path in file_paths)
+        )
+        return TestSuiteBuilder._jobs_from_sources(sources, language, test_type)
+    
+    @staticmethod
+    def _read_source(file_path: str) -> Optional[str]:
+        """Read a source file, or return None (with a warning) if it cannot be read"""
+        try:
+            with open(file_path, 'r', encoding='utf-8') as f:
+                return f.read()
+        except Exception as e:
+            logger.warning(f"Failed to read file {file_path}: {e}")
+            return None
+    
+    @staticmethod
+    def _jobs_from_sources(sources: List[Optional[str]], language: str, test_type: str) -> List[TestJob]:
+        """Build one job per readable source; IDs are unique even across runs in the same second"""
+        return [
+            TestJob(
+                id=f"file-{i}-{uuid.uuid4().hex}",
+                code=code,
+                language=language,
+                test_type=test_type,
+                priority=1  # Default priority
+            )
+            for i, code in enumerate(sources)
+            if code is not None
+        ]
     
     @staticmethod
     def from_git_diff(diff_content: str, 
@@ -420,11 +666,8 @@ class TestSuiteBuilder:
             if not file_diff.strip():
                 continue
             
-            # Extract added lines (simplified)
-            added_lines = []
-            for line in file_diff.split('\n'):
-                if line.startswith('+') and not line.startswith('+++'):
-                    added_lines.append(line[1:])  # Remove + prefix
+            # Extract added lines (simplified), without the + prefix
+            added_lines = ADDED_LINE_PATTERN.findall(file_diff)
             
             if added_lines:
                 code = '\n'.join(added_lines)
@@ -442,6 +685,7 @@ class TestSuiteBuilder:
 # Example usage and testing
 if __name__ == "__main__":
     import argparse
+    import gc
     
     parser = argparse.ArgumentParser(description='Parallel Test Executor')
     parser.add_argument('--queue-url', required=True, help='SQS queue URL')
@@ -467,27 +711,43 @@ if __name__ == "__main__":
         
         executor = ParallelTestExecutor(coordinator, config)
         
-        # Create test jobs from files
-        if args.files:
-            jobs = TestSuiteBuilder.from_file_list(args.files)
-            
-            # Progress callback
-            async def progress_callback(completed: int, total: int, last_result: TestResult):
-                print(f"Progress: {completed}/{total} ({completed/total*100:.1f}%)")
-                if last_result:
-                    print(f"Last job: {last_result.job_id} - Success: {last_result.success}")
-            
-            # Execute test suite
-            result = await executor.execute_test_suite(jobs, progress_callback)
-            
-            print(f"\nExecution Summary:")
-            print(f"Total jobs: {result.total_jobs}")
-            print(f"Completed: {result.completed_jobs}")
-            print(f"Failed: {result.failed_jobs}")
-            print(f"Execution time: {result.execution_time_ms}ms")
-            print(f"Throughput: {result.throughput_jobs_per_second:.2f} jobs/sec")
-            print(f"Error rate: {result.error_rate_percentage:.1f}%")
-        else:
-            print("No files specified. Use --files to specify files to test.")
+        try:
+            # Create test jobs from files
+            if args.files:
+                jobs = await TestSuiteBuilder.from_file_list_async(args.files)
+                
+                # The coordinator, executor and jobs live for the whole run; move them out of
+                # the collector's reach so GC passes only scan per-job garbage (no unfreeze needed
+                # because the process exits afterwards)
+                gc.freeze()
+                
+                # Progress callback
+                async def progress_callback(completed: int, total: int, last_result: TestResult):
+                    print(f"Progress: {completed}/{total} ({completed/total*100:.1f}%)")
+                    if last_result:
+                        print(f"Last job: {last_result.job_id} - Success: {last_result.success}")
+                
+                # Execute test suite
+                result = await executor.execute_test_suite(jobs, progress_callback)
+                
+                print(f"\nExecution Summary:")
+                print(f"Total jobs: {result.total_jobs}")
+                print(f"Completed: {result.completed_jobs}")
+                print(f"Failed: {result.failed_jobs}")
+                print(f"Execution time: {result.execution_time_ms}ms")
+                print(f"Throughput: {result.throughput_jobs_per_second:.2f} jobs/sec")
+                print(f"Error rate: {result.error_rate_percentage:.1f}%")
+            else:
+                print("No files specified. Use --files to specify files to test.")
+        finally:
+            executor.close()
+            await coordinator.close()
+    
+    try:
+        import uvloop
+    except ImportError:  # uvloop is optional (and unavailable on Windows); use the default loop
+        uvloop = None
     
+    if uvloop is not None:
+        uvloop.install()
     asyncio.run(main()) 
\ No newline at end of file
@@ -6,16 +6,102 @@ Generates intelligent tests using local LLM with pattern analysis and mutation t
 
 import os
 import sys
-import json
-import glob
+import asyncio
+import functools
+import concurrent.futures
 import subprocess
-import requests
+import httpx
+import orjson
 import time
 import re
 from pathlib import Path
+from string import Template
 from typing import Dict, List, Optional, Tuple
 from dataclasses import dataclass
 
+# Test file scanning patterns, compiled once rather than on every file
+IMPORT_LINE_PATTERN = re.compile(r'^import.*?;$', re.MULTILINE)
+SETUP_BLOCK_PATTERN = re.compile(r'(beforeEach|beforeAll|afterEach|afterAll)\([^}]+\}', re.DOTALL)
+MOCK_PATTERN = re.compile(r'(vi\.mock|jest\.mock|mockImplementation|mockReturnValue)[^;]+;')
+DESCRIBE_BLOCK_PATTERN = re.compile(r'describe\([^{]+\{[^}]+\}', re.DOTALL)
+TEST_BLOCK_PATTERN = re.compile(r'(it|test)\([^{]+\{[^}]+\}', re.DOTALL)
+
+# Test files without any of these in their first PREFILTER_BYTES are not analyzed
+TEST_BLOCK_MARKERS = (b'describe(', b'test(', b'it(')
+PREFILTER_BYTES = 64 * 1024
+
+# Below this many test files, scanning in-process is faster than starting worker processes
+PARALLEL_SCAN_MIN_FILES = 32
+
+# tsc incremental build info shared by validation runs (relative to the project root)
+TSC_BUILD_INFO_FILE = "node_modules/.cache/local_llm_testgen/tsc.tsbuildinfo"
+
+# Prompt budgets in tokens: the source file and each pattern snippet are cut to these
+FILE_CONTENT_TOKEN_BUDGET = 1024
+PATTERN_SNIPPET_TOKEN_BUDGET = 128
+
+# Token count estimate when no tokenizer for the model can be loaded
+CHARS_PER_TOKEN = 4
+
+# HuggingFace tokenizers of the Ollama models, for counting prompt tokens
+# (all DeepSeek-Coder sizes share one tokenizer)
+MODEL_TOKENIZERS = {
+    "deepseek-coder:1.3b": "deepseek-ai/deepseek-coder-1.3b-base",
+    "deepseek-coder:6.7b": "deepseek-ai/deepseek-coder-1.3b-base",
+    "deepseek-coder:33b": "deepseek-ai/deepseek-coder-1.3b-base"
+}
+
+# Instructions shared by every prompt. They come first, with nothing interpolated, so
+# Ollama can reuse their KV cache from the previous request and only prefill the rest
+PROMPT_PREFIX = """
+Generate comprehensive Vitest tests for a TypeScript/React file following the project's established patterns.
+
+REQUIREMENTS:
+1. Follow the existing project patterns shown below
+2. Use Vitest syntax (describe, it, expect, vi.mock)
+3. Include proper TypeScript types
+4. Mock external dependencies appropriately
+5. Test edge cases and error conditions
+6. Ensure tests are deterministic and reliable
+7. Focus on areas identified by mutation testing (if provided)
+"""
+
+# Per-file part; the pattern section (shared by files of the same kind) precedes the file itself
+PROMPT_TEMPLATE = Template(PROMPT_PREFIX + """
+PROJECT PATTERNS TO FOLLOW:
+$pattern_section
+FILE TO TEST: $file_path
+```typescript
+$file_content...
+```
+$mutation_section
+
+GENERATE: Complete test file with imports, setup, and comprehensive test cases.
+""")
+
+# How long Ollama keeps the model (and its prompt cache) loaded after a request
+OLLAMA_KEEP_ALIVE = "30m"
+
+PATTERN_SECTION_TEMPLATE = Template("""
+- Pattern Type: $pattern_type
+- Common Imports: $imports
+- Setup Pattern: $setup_code
+- Test Structure: $test_structure
+- Mocking Patterns: $mocking_patterns
+""")
+
+MUTATION_SECTION_TEMPLATE = Template("""
+
+MUTATION TESTING INSIGHTS:
+- Current Mutation Score: $mutation_score%
+- Weak Spots to Target: $weak_spots
+- Focus on improving test coverage for survived mutants
+""")
+
+# Markdown code fences around generated tests
+TYPESCRIPT_FENCE_PATTERN = re.compile(r'```typescript\n?')
+CODE_FENCE_PATTERN = re.compile(r'```\n?')
+
 @dataclass
 class TestPattern:
     """Represents a discovered test pattern from existing tests"""
@@ -35,6 +121,108 @@ class MutationResult:
     survived_mutants: int
     weak_spots: List[str]
 
+def extract_pattern(file_path: str, content: str) -> Optional[TestPattern]:
+    """Extract test patterns from a file"""
+    # Each regex scan only runs when a substring every match must contain is present;
+    # the substring checks are far cheaper than the scans they skip
+    
+    # Extract imports
+    import_lines = IMPORT_LINE_PATTERN.findall(content) if 'import' in content else []
+    
+    # Extract setup patterns (beforeEach, beforeAll, etc.)
+    if 'before' in content or 'after' in content:
+        setup_patterns = SETUP_BLOCK_PATTERN.findall(content)
+    else:
+        setup_patterns = []
+    
+    # Extract mocking patterns
+    mock_patterns = MOCK_PATTERN.findall(content) if 'mock' in content else []
+    
+    # Determine pattern type based on file content
+    if 'render(' in content and '@testing-library/react' in content:
+        pattern_type = 'react_component'
+    elif 'describe(' in content and 'it(' in content:
+        pattern_type = 'unit_test'
+    elif 'test(' in content:
+        pattern_type = 'simple_test'
+    else:
+        pattern_type = 'unknown'
+        
+    return TestPattern(
+        pattern_type=pattern_type,
+        file_path=file_path,
+        imports=import_lines,
+        setup_code='\n'.join(setup_patterns),
+        test_structure=extract_test_structure(content),
+        mocking_patterns=mock_patterns
+    )
+
+def extract_test_structure(content: str) -> str:
+    """Extract the general structure of tests"""
+    # Find the first describe block
+    if 'describe(' in content:
+        describe_block = DESCRIBE_BLOCK_PATTERN.search(content)
+        if describe_block:
+            return describe_block.group()[:200] + "..."
+    
+    # Find the first test block
+    test_block = TEST_BLOCK_PATTERN.search(content)
+    if test_block:
+        return test_block.group()[:200] + "..."
+        
+    return ""
+
+def _iter_test_files(root: str):
+    """Yield the paths of *.test.ts and *.test.tsx files under root"""
+    # One scandir walk; DirEntry caches the file type, so no extra stat per entry
+    stack = [root]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.name.endswith(('.test.ts', '.test.tsx')):
+                        yield entry.path
+        except OSError:
+            continue
+
+def _extract_pattern_file(test_file: str) -> Optional[TestPattern]:
+    """Read and analyze one test file (module-level so worker processes can run it)"""
+    try:
+        with open(test_file, 'rb') as f:
+            # Skip files with no test blocks near the top without reading or scanning the rest
+            head = f.read(PREFILTER_BYTES)
+            if not any(marker in head for marker in TEST_BLOCK_MARKERS):
+                return None
+            content = (head + f.read()).decode('utf-8')
+        
+        return extract_pattern(test_file, content)
+        
+    except Exception as e:
+        print(f"⚠️  Error analyzing {test_file}: {e}")
+        return None
+
+@functools.lru_cache(maxsize=None)
+def _load_tokenizer(model: str):
+    """HuggingFace tokenizer for an Ollama model, or None if there is none or it cannot be loaded"""
+    tokenizer_name = MODEL_TOKENIZERS.get(model)
+    if tokenizer_name is None:
+        return None
+    
+    try:
+        from transformers import AutoTokenizer
+        return AutoTokenizer.from_pretrained(tokenizer_name)
+    except Exception as e:
+        print(f"⚠️  Tokenizer {tokenizer_name} unavailable, estimating prompt token counts: {e}")
+        return None
+
+@functools.lru_cache(maxsize=4)
+def _load_mutation_report(path: str, mtime_ns: int, size: int) -> Dict:
+    """Parse a Stryker JSON report; cached until the file's mtime or size changes"""
+    with open(path, 'rb') as f:
+        return orjson.loads(f.read())
+
 class SmartTestGenerator:
     def __init__(self, ollama_url: str = "http://localhost:11434", model_tier: str = "default"):
         self.ollama_url = ollama_url
@@ -51,83 +239,91 @@ class SmartTestGenerator:
         self.project_root = Path(__file__).parent.parent
         self.test_patterns = []
         self.mutation_results = []
+        self._output_dirs = set()  # Output directories already created
+        self._batched_mutation_results = {}  # From run_mutation_testing_batch, by source file
+    
+    @functools.cached_property
+    def _http(self) -> httpx.Client:
+        """Ollama client kept for the generator's lifetime, so requests reuse one connection"""
+        return httpx.Client(
+            base_url=self.ollama_url,
+            timeout=120,
+            limits=httpx.Limits(max_keepalive_connections=32)
+        )
+    
+    def close(self):
+        """Close the Ollama connection, if one was opened"""
+        http = self.__dict__.pop('_http', None)
+        if http is not None:
+            http.close()
+    
+    @property
+    def test_patterns(self) -> List[TestPattern]:
+        return self._test_patterns
+    
+    @test_patterns.setter
+    def test_patterns(self, patterns: List[TestPattern]):
+        self._test_patterns = patterns
+        # First pattern of each type, so _find_relevant_pattern is a lookup rather than a scan
+        self._first_pattern_by_type = {}
+        for pattern in patterns:
+            self._first_pattern_by_type.setdefault(pattern.pattern_type, pattern)
         
     def analyze_existing_patterns(self) -> List[TestPattern]:
         """Analyze existing test files to discover patterns"""
         print("🔍 Analyzing existing test patterns...")
         
-        test_files = glob.glob(str(self.project_root / "tests/**/*.test.{ts,tsx}"), recursive=True)
-        patterns = []
+        test_files = sorted(_iter_test_files(str(self.project_root / "tests")))
         
-        for test_file in test_files:
-            try:
-                with open(test_file, 'r') as f:
-                    content = f.read()
-                
-                pattern = self._extract_pattern(test_file, content)
-                if pattern:
-                    patterns.append(pattern)
-                    
-            except Exception as e:
-                print(f"⚠️  Error analyzing {test_file}: {e}")
+        # Large suites are scanned by one worker process per CPU, which also keeps that many
+        # file reads in flight at once (each worker reads its own files, at most 64KB for stubs)
+        if len(test_files) >= PARALLEL_SCAN_MIN_FILES:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count()) as executor:
+                scanned = list(executor.map(_extract_pattern_file, test_files, chunksize=8))
+        else:
+            scanned = [_extract_pattern_file(test_file) for test_file in test_files]
+        
+        patterns = [pattern for pattern in scanned if pattern]
                 
         self.test_patterns = patterns
         print(f"✅ Found {len(patterns)} test patterns")
         return patterns
     
-    def _extract_pattern(self, file_path: str, content: str) -> Optional[TestPattern]:
-        """Extract test patterns from a file"""
-        # Extract imports
-        import_lines = re.findall(r'^import.*?;$', content, re.MULTILINE)
-        
-        # Extract setup patterns (beforeEach, beforeAll, etc.)
-        setup_patterns = re.findall(r'(beforeEach|beforeAll|afterEach|afterAll)\([^}]+\}', content, re.DOTALL)
-        
-        # Extract mocking patterns
-        mock_patterns = re.findall(r'(vi\.mock|jest\.mock|mockImplementation|mockReturnValue)[^;]+;', content)
-        
-        # Determine pattern type based on file content
-        if 'render(' in content and '@testing-library/react' in content:
-            pattern_type = 'react_component'
-        elif 'describe(' in content and 'it(' in content:
-            pattern_type = 'unit_test'
-        elif 'test(' in content:
-            pattern_type = 'simple_test'
-        else:
-            pattern_type = 'unknown'
-            
-        return TestPattern(
-            pattern_type=pattern_type,
-            file_path=file_path,
-            imports=import_lines,
-            setup_code='\n'.join(setup_patterns),
-            test_structure=self._extract_test_structure(content),
-            mocking_patterns=mock_patterns
-        )
-    
-    def _extract_test_structure(self, content: str) -> str:
-        """Extract the general structure of tests"""
-        # Find describe blocks
-        describe_blocks = re.findall(r'describe\([^{]+\{[^}]+\}', content, re.DOTALL)
-        if describe_blocks:
-            return describe_blocks[0][:200] + "..."
-        
-        # Find test blocks
-        test_blocks = re.findall(r'(it|test)\([^{]+\{[^}]+\}', content, re.DOTALL)
-        if test_blocks:
-            return test_blocks[0][:200] + "..."
-            
-        return ""
-    
     def run_mutation_testing(self, target_file: str) -> Optional[MutationResult]:
         """Run mutation testing on a specific file to identify weak spots"""
         print(f"🧬 Running mutation testing on {target_file}...")
         
+        data = self._run_stryker(target_file)
+        return self._parse_mutation_results(target_file, data) if data is not None else None
+    
+    def run_mutation_testing_batch(self, target_files: List[str]) -> Dict[str, MutationResult]:
+        """
+        Run mutation testing on several files with a single Stryker run
+        
+        One run pays Node.js startup and Stryker's project analysis once instead
+        of per file. The results are kept, and generating a test for one of these
+        files uses them instead of running Stryker again.
+        """
+        if not target_files:
+            return {}
+        
+        print(f"🧬 Running mutation testing on {len(target_files)} files...")
+        
+        data = self._run_stryker(','.join(target_files))
+        if data is None:
+            return {}
+        
+        results = {target_file: self._parse_mutation_results(target_file, data) for target_file in target_files}
+        self._batched_mutation_results.update(results)
+        return results
+    
+    def _run_stryker(self, mutate: str) -> Optional[Dict]:
+        """Run Stryker on the given --mutate file list and return the parsed JSON report"""
         try:
-            # Run Stryker on specific file
+            # Run Stryker on specific files
             cmd = [
                 "npx", "stryker", "run",
-                "--mutate", target_file,
+                "--mutate", mutate,
                 "--reporters", "json",
                 "--logLevel", "error"
             ]
@@ -138,10 +334,8 @@ class SmartTestGenerator:
                 # Parse mutation results
                 mutation_file = self.project_root / "coverage/mutation/mutation-report.json"
                 if mutation_file.exists():
-                    with open(mutation_file, 'r') as f:
-                        data = json.load(f)
-                    
-                    return self._parse_mutation_results(target_file, data)
+                    stat = mutation_file.stat()
+                    return _load_mutation_report(str(mutation_file), stat.st_mtime_ns, stat.st_size)
             else:
                 print(f"⚠️  Mutation testing failed: {result.stderr}")
                 
@@ -156,20 +350,22 @@ class SmartTestGenerator:
         file_data = files.get(file_path, {})
         
         mutation_score = file_data.get('mutationScore', 0)
-        killed = len([m for m in file_data.get('mutants', []) if m.get('status') == 'Killed'])
-        survived = len([m for m in file_data.get('mutants', []) if m.get('status') == 'Survived'])
         
-        # Identify weak spots (survived mutants)
+        # Count killed mutants and identify weak spots (survived mutants) in one pass
+        killed = 0
         weak_spots = []
         for mutant in file_data.get('mutants', []):
-            if mutant.get('status') == 'Survived':
+            status = mutant.get('status')
+            if status == 'Killed':
+                killed += 1
+            elif status == 'Survived':
                 weak_spots.append(f"Line {mutant.get('location', {}).get('start', {}).get('line', 'unknown')}: {mutant.get('mutatorName', 'unknown')}")
         
         return MutationResult(
             file_path=file_path,
             mutation_score=mutation_score,
             killed_mutants=killed,
-            survived_mutants=survived,
+            survived_mutants=len(weak_spots),
             weak_spots=weak_spots
         )
     
@@ -179,50 +375,49 @@ class SmartTestGenerator:
         # Find the most relevant pattern
         relevant_pattern = self._find_relevant_pattern(file_path, file_content)
         
-        base_prompt = f"""
-Generate comprehensive Vitest tests for this TypeScript/React file following the project's established patterns.
-
-FILE TO TEST: {file_path}
-```typescript
-{file_content[:2000]}...
-```
-
-PROJECT PATTERNS TO FOLLOW:
-"""
-
+        pattern_section = ""
         if relevant_pattern:
-            base_prompt += f"""
-- Pattern Type: {relevant_pattern.pattern_type}
-- Common Imports: {', '.join(relevant_pattern.imports[:3])}
-- Setup Pattern: {relevant_pattern.setup_code[:200]}
-- Test Structure: {relevant_pattern.test_structure[:200]}
-- Mocking Patterns: {', '.join(relevant_pattern.mocking_patterns[:2])}
-"""
-
+            pattern_section = PATTERN_SECTION_TEMPLATE.substitute(
+                pattern_type=relevant_pattern.pattern_type,
+                imports=', '.join(relevant_pattern.imports[:3]),
+                setup_code=self._truncate_tokens(relevant_pattern.setup_code, PATTERN_SNIPPET_TOKEN_BUDGET),
+                test_structure=self._truncate_tokens(relevant_pattern.test_structure, PATTERN_SNIPPET_TOKEN_BUDGET),
+                mocking_patterns=', '.join(relevant_pattern.mocking_patterns[:2])
+            )
+        
+        mutation_section = ""
         if mutation_result:
-            base_prompt += f"""
-
-MUTATION TESTING INSIGHTS:
-- Current Mutation Score: {mutation_result.mutation_score}%
-- Weak Spots to Target: {', '.join(mutation_result.weak_spots[:3])}
-- Focus on improving test coverage for survived mutants
-"""
-
-        base_prompt += """
-
-REQUIREMENTS:
-1. Follow the existing project patterns shown above
-2. Use Vitest syntax (describe, it, expect, vi.mock)
-3. Include proper TypeScript types
-4. Mock external dependencies appropriately
-5. Test edge cases and error conditions
-6. Ensure tests are deterministic and reliable
-7. Focus on areas identified by mutation testing (if provided)
-
-GENERATE: Complete test file with imports, setup, and comprehensive test cases.
-"""
-
-        return base_prompt
+            mutation_section = MUTATION_SECTION_TEMPLATE.substitute(
+                mutation_score=mutation_result.mutation_score,
+                weak_spots=', '.join(mutation_result.weak_spots[:3])
+            )
+        
+        return PROMPT_TEMPLATE.substitute(
+            file_path=file_path,
+            file_content=self._truncate_tokens(file_content, FILE_CONTENT_TOKEN_BUDGET),
+            pattern_section=pattern_section,
+            mutation_section=mutation_section
+        )
+    
+    def _truncate_tokens(self, text: str, max_tokens: int) -> str:
+        """
+        Cut text to at most max_tokens tokens of the model's tokenizer
+        
+        Without a tokenizer for the model, the count is estimated at
+        CHARS_PER_TOKEN characters per token.
+        """
+        # Every token covers at least one character
+        if len(text) <= max_tokens:
+            return text
+        
+        tokenizer = _load_tokenizer(self.model)
+        if tokenizer is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        
+        token_ids = tokenizer.encode(text, add_special_tokens=False)
+        if len(token_ids) <= max_tokens:
+            return text
+        return tokenizer.decode(token_ids[:max_tokens])
     
     def _find_relevant_pattern(self, file_path: str, content: str) -> Optional[TestPattern]:
         """Find the most relevant test pattern for the given file"""
@@ -232,12 +427,10 @@ GENERATE: Complete test file with imports, setup, and comprehensive test cases.
         # Determine file type
         if '.tsx' in file_path and ('export default' in content or 'function' in content):
             # React component
-            react_patterns = [p for p in self.test_patterns if p.pattern_type == 'react_component']
-            return react_patterns[0] if react_patterns else None
+            return self._first_pattern_by_type.get('react_component')
         elif '.ts' in file_path and 'export' in content:
             # Utility/service file
-            unit_patterns = [p for p in self.test_patterns if p.pattern_type == 'unit_test']
-            return unit_patterns[0] if unit_patterns else None
+            return self._first_pattern_by_type.get('unit_test')
             
         # Default to first available pattern
         return self.test_patterns[0] if self.test_patterns else None
@@ -247,62 +440,170 @@ GENERATE: Complete test file with imports, setup, and comprehensive test cases.
         print(f"🤖 Generating smart test for {file_path}...")
         
         try:
-            # Read the source file
-            with open(file_path, 'r') as f:
-                content = f.read()
-            
-            # Run mutation testing if test already exists
-            existing_test = output_path.replace('.test.', '.test.')
-            mutation_result = None
-            if os.path.exists(existing_test):
-                mutation_result = self.run_mutation_testing(file_path)
-            
-            # Generate smart prompt
-            prompt = self.generate_smart_prompt(file_path, content, mutation_result)
+            request = self._build_generate_request(file_path, output_path)
             
-            # Call Ollama API
-            response = requests.post(
-                f"{self.ollama_url}/api/generate",
-                json={
-                    "model": self.model,
-                    "prompt": prompt,
-                    "stream": False,
-                    "options": {
-                        "temperature": 0.1,
-                        "top_p": 0.9,
-                        "num_predict": 2048
-                    }
-                },
-                timeout=120
-            )
+            # Call Ollama API, reading the response as it is generated
+            with self._http.stream("POST", "/api/generate", json=request) as response:
+                if response.status_code != 200:
+                    print(f"❌ API error: {response.status_code}")
+                    return False
+                
+                generated = []
+                for line in response.iter_lines():
+                    if self._read_stream_chunk(line, generated):
+                        break
             
-            if response.status_code == 200:
-                result = response.json()
-                generated_test = result.get('response', '')
+            self._write_generated_test(output_path, ''.join(generated))
+            return True
                 
-                # Clean up the generated test
-                cleaned_test = self._clean_generated_test(generated_test)
+        except Exception as e:
+            print(f"❌ Error generating test: {e}")
+            return False
+    
+    async def generate_test_with_ai_async(self, file_path: str, output_path: str,
+                                          client: httpx.AsyncClient, semaphore: asyncio.Semaphore) -> bool:
+        """Generate test using AI with smart prompting, without blocking other generations"""
+        async with semaphore:
+            print(f"🤖 Generating smart test for {file_path}...")
+            
+            try:
+                # Reading the file and mutation testing block, so they run off the event loop
+                request = await asyncio.to_thread(self._build_generate_request, file_path, output_path)
                 
-                # Write to output file
-                os.makedirs(os.path.dirname(output_path), exist_ok=True)
-                with open(output_path, 'w') as f:
-                    f.write(cleaned_test)
+                # Call Ollama API, reading the response as it is generated
+                async with client.stream("POST", f"{self.ollama_url}/api/generate", json=request) as response:
+                    if response.status_code != 200:
+                        print(f"❌ API error for {file_path}: {response.status_code}")
+                        return False
+                    
+                    generated = []
+                    async for line in response.aiter_lines():
+                        if self._read_stream_chunk(line, generated):
+                            break
                 
-                print(f"✅ Generated test: {output_path}")
+                self._write_generated_test(output_path, ''.join(generated))
                 return True
-            else:
-                print(f"❌ API error: {response.status_code}")
+                    
+            except Exception as e:
+                print(f"❌ Error generating test for {file_path}: {e}")
                 return False
+    
+    async def generate_many(self, pairs: List[Tuple[str, str]], max_concurrency: int = 4) -> List[bool]:
+        """
+        Generate tests for many (source_file, output_file) pairs concurrently
+        
+        At most max_concurrency requests are in flight at once; Ollama only
+        processes OLLAMA_NUM_PARALLEL of them in parallel per loaded model.
+        """
+        await self._run_batched_mutation_testing(pairs)
+        
+        semaphore = asyncio.Semaphore(max_concurrency)
+        async with httpx.AsyncClient(timeout=120) as client:
+            results = await asyncio.gather(
+                *(self.generate_test_with_ai_async(file_path, output_path, client, semaphore)
+                  for file_path, output_path in pairs),
+                return_exceptions=True
+            )
+        return [result is True for result in results]
+    
+    async def generate_tests_batch(self, items: List[Tuple[str, str]], batch_size: int = 8) -> List[bool]:
+        """
+        Generate tests for (source_file, output_file) items in batches
+        
+        Ollama has no multi-prompt endpoint, so each batch of batch_size prompts
+        is sent all at once over one kept-alive connection pool and the next
+        batch starts when the whole batch has returned, letting the server fill
+        its parallel slots (OLLAMA_NUM_PARALLEL) together.
+        """
+        await self._run_batched_mutation_testing(items)
+        
+        results = []
+        semaphore = asyncio.Semaphore(batch_size)
+        async with httpx.AsyncClient(timeout=120) as client:
+            for batch_start in range(0, len(items), batch_size):
+                batch = items[batch_start:batch_start + batch_size]
+                print(f"📦 Batch {batch_start // batch_size + 1}: {len(batch)} files")
                 
-        except Exception as e:
-            print(f"❌ Error generating test: {e}")
+                batch_results = await asyncio.gather(
+                    *(self.generate_test_with_ai_async(file_path, output_path, client, semaphore)
+                      for file_path, output_path in batch),
+                    return_exceptions=True
+                )
+                results.extend(result is True for result in batch_results)
+        return results
+    
+    async def _run_batched_mutation_testing(self, pairs: List[Tuple[str, str]]):
+        """Mutation test, in one Stryker run, every source file whose test already exists"""
+        target_files = [file_path for file_path, output_path in pairs if os.path.exists(output_path)]
+        if len(target_files) > 1:
+            await asyncio.to_thread(self.run_mutation_testing_batch, target_files)
+    
+    def _build_generate_request(self, file_path: str, output_path: str) -> Dict:
+        """Read the source file and build the Ollama /api/generate request body for it"""
+        # Read the source file
+        with open(file_path, 'r') as f:
+            content = f.read()
+        
+        # Run mutation testing if test already exists
+        existing_test = output_path.replace('.test.', '.test.')
+        mutation_result = None
+        if os.path.exists(existing_test):
+            mutation_result = self._batched_mutation_results.get(file_path) or self.run_mutation_testing(file_path)
+        
+        # Generate smart prompt
+        prompt = self.generate_smart_prompt(file_path, content, mutation_result)
+        
+        return {
+            "model": self.model,
+            "prompt": prompt,
+            "stream": True,
+            "keep_alive": OLLAMA_KEEP_ALIVE,
+            "options": {
+                "temperature": 0.1,
+                "top_p": 0.9,
+                "num_predict": 2048
+            }
+        }
+    
+    @staticmethod
+    def _read_stream_chunk(line, generated: List[str]) -> bool:
+        """
+        Append the text of one streamed /api/generate chunk to generated
+        
+        Streaming keeps the request timeout between chunks rather than on the whole
+        generation, so long tests no longer time out at 120s.
+        
+        Returns:
+            True once the final chunk (done) has been read
+        """
+        if not line:
             return False
+        
+        chunk = orjson.loads(line)
+        if 'error' in chunk:
+            raise RuntimeError(chunk['error'])
+        
+        generated.append(chunk.get('response', ''))
+        return chunk.get('done', False)
+    
+    def _write_generated_test(self, output_path: str, generated_test: str):
+        """Clean up a generated test and write it to output_path"""
+        cleaned_test = self._clean_generated_test(generated_test)
+        
+        output_dir = os.path.dirname(output_path)
+        if output_dir not in self._output_dirs:
+            os.makedirs(output_dir, exist_ok=True)
+            self._output_dirs.add(output_dir)
+        with open(output_path, 'w') as f:
+            f.write(cleaned_test)
+        
+        print(f"✅ Generated test: {output_path}")
     
     def _clean_generated_test(self, test_content: str) -> str:
         """Clean up AI-generated test content"""
         # Remove markdown code blocks
-        test_content = re.sub(r'```typescript\n?', '', test_content)
-        test_content = re.sub(r'```\n?', '', test_content)
+        test_content = TYPESCRIPT_FENCE_PATTERN.sub('', test_content)
+        test_content = CODE_FENCE_PATTERN.sub('', test_content)
         
         # Ensure proper imports
         if 'import { describe, it, expect' not in test_content:
@@ -316,35 +617,79 @@ GENERATE: Complete test file with imports, setup, and comprehensive test cases.
         
         try:
             # Run TypeScript check
-            result = subprocess.run(
-                ["npx", "tsc", "--noEmit", test_file],
-                capture_output=True,
-                text=True,
-                cwd=self.project_root
-            )
+            result = self._typecheck([test_file])
             
             if result.returncode != 0:
-                print(f"❌ TypeScript errors: {result.stderr}")
+                print(f"❌ TypeScript errors: {result.stdout or result.stderr}")
                 return False
             
-            # Run the test
-            result = subprocess.run(
-                ["npm", "run", "test", test_file],
-                capture_output=True,
-                text=True,
-                cwd=self.project_root
-            )
-            
-            if result.returncode == 0:
-                print(f"✅ Test validation passed")
-                return True
-            else:
-                print(f"❌ Test execution failed: {result.stderr}")
-                return False
+            return self._run_generated_test(test_file)
                 
         except Exception as e:
             print(f"❌ Validation error: {e}")
             return False
+    
+    def validate_generated_tests(self, test_files: List[str]) -> Dict[str, bool]:
+        """
+        Validate several generated tests, type-checking them in a single tsc run
+        
+        If that run reports errors, each file is checked on its own to find
+        which ones fail; the incremental build info keeps those re-checks cheap.
+        """
+        if not test_files:
+            return {}
+        
+        print(f"🔍 Type-checking {len(test_files)} generated tests...")
+        try:
+            typechecked = self._typecheck(test_files).returncode == 0
+        except Exception as e:
+            print(f"⚠️  Batch type check failed to run: {e}")
+            typechecked = False
+        
+        if not typechecked:
+            return {test_file: self.validate_generated_test(test_file) for test_file in test_files}
+        
+        results = {}
+        for test_file in test_files:
+            print(f"🔍 Validating {test_file}...")
+            try:
+                results[test_file] = self._run_generated_test(test_file)
+            except Exception as e:
+                print(f"❌ Validation error: {e}")
+                results[test_file] = False
+        return results
+    
+    def _typecheck(self, test_files: List[str]) -> subprocess.CompletedProcess:
+        """
+        Type-check test files with tsc
+        
+        --incremental keeps build info between runs, so later checks reuse the
+        type information of unchanged dependencies instead of rebuilding it.
+        """
+        return subprocess.run(
+            ["npx", "tsc", "--noEmit", "--pretty", "false",
+             "--incremental", "--tsBuildInfoFile", str(self.project_root / TSC_BUILD_INFO_FILE),
+             *test_files],
+            capture_output=True,
+            text=True,
+            cwd=self.project_root
+        )
+    
+    def _run_generated_test(self, test_file: str) -> bool:
+        """Run a generated test with the project's test runner"""
+        result = subprocess.run(
+            ["npm", "run", "test", test_file],
+            capture_output=True,
+            text=True,
+            cwd=self.project_root
+        )
+        
+        if result.returncode == 0:
+            print(f"✅ Test validation passed")
+            return True
+        else:
+            print(f"❌ Test execution failed: {result.stderr}")
+            return False
 
 def main():
     # Check for help first
@@ -354,6 +699,7 @@ def main():
 
 USAGE:
     python local_llm_testgen.py [--model=<tier>] <source_file> [output_file]
+    python local_llm_testgen.py [--model=<tier>] [--concurrency=<n> | --batch-size=<n>] <source_file> <source_file>...
 
 EXAMPLES:
     # Generate test for a React component (default model)
@@ -367,6 +713,12 @@ EXAMPLES:
     
     # Test a chart component (will analyze existing patterns)
     python local_llm_testgen.py client/src/components/dashboards/PredictiveRevenueChart/index.tsx
+    
+    # Generate tests for several files at once (requests overlap instead of running one by one)
+    python local_llm_testgen.py --concurrency=4 client/src/utils/*.ts
+    
+    # Send prompts in batches of 8 that start together
+    python local_llm_testgen.py --batch-size=8 client/src/utils/*.ts
 
 MODEL TIERS:
     fast     - deepseek-coder:1.3b (1.3GB) - Ultra-fast iteration
@@ -391,35 +743,51 @@ FEATURES:
 REQUIREMENTS:
     - Ollama running with deepseek-coder:6.7b model
     - Source file must exist and be .ts or .tsx
+
+CONCURRENCY:
+    With several source files, up to --concurrency (default 4) generations are
+    sent at once. Ollama serves them in parallel only up to its own limits, set
+    on the Ollama server. --batch-size=<n> instead sends n prompts together and
+    waits for the whole batch before sending the next one.
+    OLLAMA_NUM_PARALLEL      - parallel requests per loaded model
+    OLLAMA_MAX_LOADED_MODELS - models kept loaded at the same time
         """)
         sys.exit(0)
     
     # Parse arguments
     model_tier = "default"
-    source_file = None
-    output_file = None
+    concurrency = 4
+    batch_size = None
+    paths = []
     
     for arg in sys.argv[1:]:
         if arg.startswith('--model='):
             model_tier = arg.split('=')[1]
+        elif arg.startswith('--concurrency='):
+            concurrency = max(1, int(arg.split('=')[1]))
+        elif arg.startswith('--batch-size='):
+            batch_size = max(1, int(arg.split('=')[1]))
         elif arg in ['--help', '-h']:
             continue  # Already handled above
-        elif source_file is None:
-            source_file = arg
-        elif output_file is None:
-            output_file = arg
+        else:
+            paths.append(arg)
     
-    if not source_file:
+    if not paths:
         print("❌ Source file required")
         sys.exit(1)
     
-    # Validate source file exists
-    if not os.path.exists(source_file):
-        print(f"❌ Source file not found: {source_file}")
-        sys.exit(1)
+    # A second path that is a test file is the output for the first; otherwise all paths are sources
+    if len(paths) == 2 and '.test.' in paths[1]:
+        pairs = [(paths[0], paths[1])]
+    else:
+        pairs = [(source_file, source_file.replace('.tsx', '.test.tsx').replace('.ts', '.test.ts'))
+                 for source_file in paths]
     
-    if not output_file:
-        output_file = source_file.replace('.tsx', '.test.tsx').replace('.ts', '.test.ts')
+    # Validate source files exist
+    for source_file, _ in pairs:
+        if not os.path.exists(source_file):
+            print(f"❌ Source file not found: {source_file}")
+            sys.exit(1)
     
     generator = SmartTestGenerator(model_tier=model_tier)
     print(f"🤖 Using model: {generator.model}")
@@ -430,8 +798,25 @@ REQUIREMENTS:
     # Analyze existing patterns
     generator.analyze_existing_patterns()
     
+    if len(pairs) > 1:
+        # Generate tests for all files concurrently, then validate the ones that were generated
+        if batch_size:
+            results = asyncio.run(generator.generate_tests_batch(pairs, batch_size=batch_size))
+        else:
+            results = asyncio.run(generator.generate_many(pairs, max_concurrency=concurrency))
+        generated = [output_file for (_, output_file), success in zip(pairs, results) if success]
+        
+        valid = sum(generator.validate_generated_tests(generated).values())
+        print(f"📊 Generated {len(generated)}/{len(pairs)} tests, {valid} passed validation")
+        if len(generated) < len(pairs):
+            sys.exit(1)
+        return
+    
+    source_file, output_file = pairs[0]
+    
     # Generate test with AI
     success = generator.generate_test_with_ai(source_file, output_file)
+    generator.close()
     
     if success:
         # Validate the generated test
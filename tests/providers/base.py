@@ -0,0 +1,24 @@
+#!/usr/bin/env python3
+"""
+Shared types for Llama 4 Maverick model providers
+"""
+
+from typing import Dict, Any
+from dataclasses import dataclass
+
+# Reported with every generation response
+MODEL_METADATA = {
+    "model": "llama4-maverick",
+    "active_params": "17B",
+    "total_params": "400B",
+    "experts": 128,
+    "architecture": "MoE"
+}
+
+@dataclass
+class GenerationResponse:
+    """Response from model generation"""
+    text: str
+    duration: float
+    usage: Dict[str, int]
+    metadata: Dict[str, Any]
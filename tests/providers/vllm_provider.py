@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+vLLM Provider for Llama 4 Maverick Testing
+Talks to a running vLLM OpenAI-compatible server, which batches concurrent requests
+(continuous batching, PagedAttention) instead of generating one prompt at a time
+
+Start the server once with the command from VLLMConfig.serve_command(), e.g.:
+    vllm serve meta-llama/Llama-4-Maverick-17B-128E-Instruct \
+        --enable-chunked-prefill --max-num-batched-tokens 2048 --long-prefill-token-threshold 512 \
+        --enable-prefix-caching --gpu-memory-utilization 0.92 --dtype bfloat16 \
+        --kv-cache-dtype fp8 --quantization fp8
+
+With two GPU groups (each able to hold the model), prefill and decode can run on
+separate instances so long prompt prefills never stall decoding. Add the same
+flags to both, give each its own GPUs, and start vLLM's disaggregated prefill
+proxy (examples/online_serving/disaggregated_prefill*) on port 8000 in front of them:
+    CUDA_VISIBLE_DEVICES=0 vllm serve <model> --port 8100 \
+        --kv-transfer-config '{"kv_connector":"PyNcclConnector","kv_role":"kv_producer","kv_rank":0,"kv_parallel_size":2}'
+    CUDA_VISIBLE_DEVICES=1 vllm serve <model> --port 8200 \
+        --kv-transfer-config '{"kv_connector":"PyNcclConnector","kv_role":"kv_consumer","kv_rank":1,"kv_parallel_size":2}'
+VLLMConfig.base_url then points at the proxy; nothing else changes.
+"""
+
+import time
+from typing import Dict, Any, Optional, Callable, Tuple
+from dataclasses import dataclass
+from openai import AsyncOpenAI
+
+from .base import GenerationResponse, MODEL_METADATA
+
+@dataclass
+class VLLMConfig:
+    """Configuration for vLLM provider"""
+    base_url: str = "http://localhost:8000/v1"
+    api_key: str = "EMPTY"  # Only checked if the server was started with --api-key
+    timeout: float = 600.0
+    # Server-side settings, used by serve_command(). Chunked prefill splits long prompts
+    # into chunks that are scheduled alongside running decodes, so one long prompt does
+    # not stall the tokens of the others.
+    max_num_batched_tokens: int = 2048
+    long_prefill_token_threshold: int = 512
+    gpu_memory_utilization: float = 0.92
+    dtype: str = "bfloat16"
+    # FP8 halves the KV cache and weight bytes read per decode step (and doubles the batch
+    # that fits). FP8 needs Ada/Hopper GPUs; use weight_quant="awq"/"gptq" with a matching
+    # checkpoint on older hardware, or None to serve the checkpoint's own weights.
+    kv_cache_dtype: str = "fp8"
+    weight_quant: Optional[str] = "fp8"
+    
+    def serve_command(self, model_name: str) -> str:
+        """`vllm serve` command line for a server matching this config"""
+        return (
+            f"vllm serve {model_name} --enable-chunked-prefill "
+            f"--max-num-batched-tokens {self.max_num_batched_tokens} "
+            f"--long-prefill-token-threshold {self.long_prefill_token_threshold} "
+            f"--enable-prefix-caching --gpu-memory-utilization {self.gpu_memory_utilization} "
+            f"--dtype {self.dtype} --kv-cache-dtype {self.kv_cache_dtype}"
+            + (f" --quantization {self.weight_quant}" if self.weight_quant else "")
+        )
+
+class VLLMProvider:
+    """vLLM provider for Llama 4 models (same interface as HuggingFaceProvider)"""
+    
+    def __init__(self, config: VLLMConfig):
+        self.config = config
+        self.client = AsyncOpenAI(base_url=config.base_url, api_key=config.api_key, timeout=config.timeout)
+        self.model_name: Optional[str] = None
+        self.is_loaded = False
+    
+    async def is_available(self) -> bool:
+        """Check if the vLLM server is reachable"""
+        try:
+            models = await self.client.models.list()
+            print(f"✅ vLLM server at {self.config.base_url} serving: {', '.join(m.id for m in models.data)}")
+            return True
+        except Exception as e:
+            print(f"❌ vLLM server not reachable at {self.config.base_url}: {e}")
+            return False
+    
+    async def load_model(self, model_name: str) -> bool:
+        """Same as ping: the server loads the model at startup and keeps it loaded"""
+        return await self.ping(model_name)
+    
+    async def ping(self, model_name: str) -> bool:
+        """Check that the server serves model_name and use it for generation"""
+        try:
+            models = await self.client.models.list()
+            served = [m.id for m in models.data]
+            if model_name not in served:
+                print(f"❌ {model_name} is not served by vLLM (serving: {', '.join(served)})")
+                return False
+            
+            self.model_name = model_name
+            self.is_loaded = True
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to reach vLLM server: {e}")
+            self.is_loaded = False
+            return False
+    
+    async def generate(self, prompt: str, options: Dict[str, Any] = None, system: Optional[str] = None,
+                       until: Optional[Callable[[str], bool]] = None) -> GenerationResponse:
+        """
+        Generate response using Llama 4 Maverick
+        
+        Args:
+            until: Called with each newly streamed piece of text; generation stops
+                early once it returns True
+        """
+        if not self.is_loaded:
+            raise RuntimeError("Model not loaded")
+        
+        options = options or {}
+        start_time = time.time()
+        
+        messages = [{"role": "user", "content": prompt}]
+        if system:
+            messages.insert(0, {"role": "system", "content": system})
+        
+        request = {
+            "model": self.model_name,
+            "messages": messages,
+            "max_tokens": options.get("max_tokens", 500),
+            "temperature": options.get("temperature", 0.1),
+            "top_p": options.get("top_p", 0.9),
+            "extra_body": {"repetition_penalty": options.get("repetition_penalty", 1.1)}
+        }
+        
+        try:
+            if until is None:
+                completion = await self.client.chat.completions.create(**request)
+                text = completion.choices[0].message.content or ""
+                usage = completion.usage
+                stopped_early = False
+            else:
+                text, usage, stopped_early = await self._stream_until(request, until)
+            
+            duration = time.time() - start_time
+            
+            return GenerationResponse(
+                text=text,
+                duration=duration,
+                usage={
+                    "prompt_tokens": usage.prompt_tokens if usage else 0,
+                    "completion_tokens": usage.completion_tokens if usage else 0,
+                    "total_tokens": usage.total_tokens if usage else 0
+                },
+                metadata={**MODEL_METADATA, "engine": "vllm", "stopped_early": stopped_early}
+            )
+            
+        except Exception as e:
+            duration = time.time() - start_time
+            raise RuntimeError(f"Generation failed after {duration:.2f}s: {e}")
+    
+    async def _stream_until(self, request: Dict[str, Any], until: Callable[[str], bool]) -> Tuple[str, Any, bool]:
+        """Stream a completion until `until` accepts a piece; returns (text, usage, stopped_early)"""
+        stream = await self.client.chat.completions.create(
+            **request,
+            stream=True,
+            # vLLM can report usage on every chunk, so it is known even when we stop early
+            stream_options={"include_usage": True, "continuous_usage_stats": True}
+        )
+        
+        pieces = []
+        usage = None
+        stopped_early = False
+        try:
+            async for chunk in stream:
+                if chunk.usage:
+                    usage = chunk.usage
+                if not chunk.choices or not chunk.choices[0].delta.content:
+                    continue
+                
+                delta = chunk.choices[0].delta.content
+                pieces.append(delta)
+                if until(delta):
+                    stopped_early = True
+                    break
+        finally:
+            # Closing the connection aborts the request on the server and frees its KV blocks
+            await stream.close()
+        
+        return "".join(pieces), usage, stopped_early
+    
+    async def generate_with_prefix(self, prefix: str, suffix: str, options: Dict[str, Any] = None,
+                                   until: Optional[Callable[[str], bool]] = None) -> GenerationResponse:
+        """
+        Generate a response for prefix + suffix (same interface as HuggingFaceProvider)
+        
+        The prefix goes first as the system message; with --enable-prefix-caching the
+        server reuses its KV blocks across requests, so only the suffix is prefilled.
+        """
+        return await self.generate(suffix, options, system=prefix, until=until)
+    
+    def get_memory_usage(self) -> Dict[str, Any]:
+        """Get current memory usage (GPU memory belongs to the server process)"""
+        return {"gpu_available": False}
+    
+    async def unload_model(self):
+        """Close the connection; the server keeps the model loaded"""
+        await self.client.close()
+        self.is_loaded = False
+        print("✅ Disconnected from vLLM server")
@@ -2,6 +2,13 @@
 """
 Llama 4 Maverick Testing Script
 Accelerated implementation for meta-llama/Llama-4-Maverick-17B-128E-Instruct
+
+With the default vLLM engine the model lives in a long-running server, so each
+run only connects to it. Start the server once, e.g. with Docker:
+    docker run -d --name maverick --gpus all --ipc=host -p 8000:8000 --restart unless-stopped \
+        -v ~/.cache/huggingface:/root/.cache/huggingface -e HF_TOKEN \
+        vllm/vllm-openai:latest --model meta-llama/Llama-4-Maverick-17B-128E-Instruct <flags>
+where <flags> are the ones printed by VLLMConfig.serve_command() (providers/vllm_provider.py).
 """
 
 import asyncio
@@ -9,19 +16,69 @@ import json
 import time
 import sys
 import os
-from typing import Dict, Any
+from typing import Dict, Any, Literal, Tuple
 
 # Add the scripts directory to the path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from providers.huggingface_provider import HuggingFaceProvider, HuggingFaceConfig
+# Byte-identical start of every test prompt. Providers cache its KV (vLLM prefix caching,
+# HuggingFaceProvider.generate_with_prefix), so only each prompt's own body is prefilled.
+SYSTEM_PREAMBLE = (
+    "You are assisting an engineering team that builds React and TypeScript applications "
+    "tested with Jest and React Testing Library. Ground every answer in the material provided, "
+    "be specific, and put code in fenced blocks.\n"
+)
+
+class _ValidationWatcher:
+    """
+    Applies _validate_response's length and keyword thresholds to streamed text
+    
+    Each call only scans the new piece (plus enough of the previous tail to catch
+    a keyword split across pieces) and returns True once both thresholds are met,
+    at which point the rest of the generation cannot change the outcome.
+    """
+    
+    def __init__(self, keywords: Tuple[str, ...], min_keywords: int, min_length: int):
+        self.pending = set(keywords)
+        self.min_keywords = min_keywords
+        self.min_length = min_length
+        self.overlap = max(len(keyword) for keyword in keywords) - 1
+        self.found = 0
+        self.length = 0
+        self.tail = ""
+    
+    def __call__(self, delta: str) -> bool:
+        self.length += len(delta)
+        if self.found < self.min_keywords:
+            window = self.tail + delta.lower()
+            hits = {keyword for keyword in self.pending if keyword in window}
+            self.pending -= hits
+            self.found += len(hits)
+            self.tail = window[-self.overlap:] if self.overlap else ""
+        return self.length >= self.min_length and self.found >= self.min_keywords
 
 class Llama4MaverickTester:
-    def __init__(self):
+    # Per prompt type: (keywords, min_keywords, min_length) a valid response must meet
+    _VALIDATION: Dict[str, Tuple[Tuple[str, ...], int, int]] = {
+        "enterprise_test_generation": (('test', 'describe', 'it', 'expect', 'mock', 'render', 'component', 'async'), 5, 500),
+        "architectural_analysis": (('architecture', 'pattern', 'component', 'structure', 'recommendation', 'scalability'), 4, 300),
+        "complex_debugging": (('debug', 'issue', 'memory', 'leak', 'performance', 'useeffect', 'state'), 4, 300),
+    }
+    
+    def __init__(self, engine: Literal["vllm", "hf"] = "vllm", vllm_url: str = "http://localhost:8000/v1"):
+        """
+        Args:
+            engine: "vllm" to use a running vLLM server (see providers/vllm_provider.py),
+                "hf" to load the model in-process with HuggingFace Transformers (no chunked
+                prefill, so a long prompt delays the others until its prefill finishes)
+            vllm_url: OpenAI-compatible base URL of the vLLM server
+        """
         self.model_name = "meta-llama/Llama-4-Maverick-17B-128E-Instruct"
+        self.engine = engine
+        self.vllm_url = vllm_url
         self.provider = None
         
-        # Enhanced prompts for Llama 4 Maverick testing
+        # Enhanced prompts for Llama 4 Maverick testing (sent after SYSTEM_PREAMBLE)
         self.test_prompts = {
             "enterprise_test_generation": """
             You are an expert software testing engineer. Analyze this React TypeScript component and generate a comprehensive test suite.
@@ -225,13 +282,19 @@ class Llama4MaverickTester:
         }
     
     async def initialize_provider(self) -> bool:
-        """Initialize Hugging Face provider for Llama 4 Maverick"""
+        """Initialize the provider for Llama 4 Maverick (vLLM server or Hugging Face)"""
+        if self.engine == "vllm":
+            return await self._initialize_vllm_provider()
+        
+        # Imported here so the vLLM path does not need torch/transformers installed
+        from providers.huggingface_provider import HuggingFaceProvider, HuggingFaceConfig
+        
         try:
             config = HuggingFaceConfig(
                 hf_token=os.getenv('HF_TOKEN'),
                 cache_dir='./models/huggingface',
                 device_map='auto',
-                torch_dtype='float16'
+                torch_dtype='bfloat16'
             )
             
             self.provider = HuggingFaceProvider(config)
@@ -248,6 +311,36 @@ class Llama4MaverickTester:
             print(f"❌ Failed to initialize provider: {e}")
             return False
     
+    async def _initialize_vllm_provider(self) -> bool:
+        """Connect to a running vLLM server"""
+        from providers.vllm_provider import VLLMProvider, VLLMConfig
+        
+        try:
+            config = VLLMConfig(base_url=self.vllm_url)
+            self.provider = VLLMProvider(config)
+            
+            if not await self.provider.is_available():
+                print(f"❌ vLLM server not available. Start it with `{config.serve_command(self.model_name)}` or use --engine hf.")
+                return False
+            
+            print("✅ vLLM provider initialized")
+            return True
+            
+        except Exception as e:
+            print(f"❌ Failed to initialize provider: {e}")
+            return False
+    
+    async def connect_to_model(self) -> bool:
+        """Make the model ready: check the vLLM server serves it, or load it in-process (hf)"""
+        if self.engine != "vllm":
+            return await self.load_maverick_model()
+        
+        if not await self.provider.ping(self.model_name):
+            return False
+        
+        print("✅ Connected to Llama 4 Maverick on the vLLM server")
+        return True
+    
     async def load_maverick_model(self) -> bool:
         """Load Llama 4 Maverick model"""
         if not self.provider:
@@ -281,15 +374,21 @@ class Llama4MaverickTester:
         
         start_time = time.time()
         
+        # Stop decoding as soon as the response is known to pass validation
+        criteria = self._VALIDATION.get(prompt_type)
+        until = _ValidationWatcher(*criteria) if criteria else None
+        
         try:
-            response = await self.provider.generate(
+            response = await self.provider.generate_with_prefix(
+                SYSTEM_PREAMBLE,
                 prompt,
                 options={
                     "max_tokens": max_tokens,
                     "temperature": 0.1,
                     "top_p": 0.9,
                     "repetition_penalty": 1.1
-                }
+                },
+                until=until
             )
             
             # Validate response quality
@@ -304,9 +403,9 @@ class Llama4MaverickTester:
                 "is_valid": is_valid,
                 "response_length": len(response.text),
                 "token_usage": {
-                    "prompt_tokens": response.usage.prompt_tokens,
-                    "completion_tokens": response.usage.completion_tokens,
-                    "total_tokens": response.usage.total_tokens
+                    "prompt_tokens": response.usage["prompt_tokens"],
+                    "completion_tokens": response.usage["completion_tokens"],
+                    "total_tokens": response.usage["total_tokens"]
                 },
                 "metadata": response.metadata
             }
@@ -322,25 +421,25 @@ class Llama4MaverickTester:
     
     def _validate_response(self, response: str, prompt_type: str) -> bool:
         """Validate response quality based on prompt type"""
-        response_lower = response.lower()
-        
-        if prompt_type == "enterprise_test_generation":
-            keywords = ['test', 'describe', 'it', 'expect', 'mock', 'render', 'component', 'async']
-            min_keywords = 5
-            min_length = 500
-        elif prompt_type == "architectural_analysis":
-            keywords = ['architecture', 'pattern', 'component', 'structure', 'recommendation', 'scalability']
-            min_keywords = 4
-            min_length = 300
-        elif prompt_type == "complex_debugging":
-            keywords = ['debug', 'issue', 'memory', 'leak', 'performance', 'useeffect', 'state']
-            min_keywords = 4
-            min_length = 300
-        else:
+        criteria = self._VALIDATION.get(prompt_type)
+        if criteria is None:
             return len(response) > 100
         
-        found_keywords = sum(1 for keyword in keywords if keyword in response_lower)
-        return len(response) >= min_length and found_keywords >= min_keywords
+        keywords, min_keywords, min_length = criteria
+        if len(response) < min_length:
+            return False
+        return self._has_keywords(response.lower(), keywords, min_keywords)
+    
+    @staticmethod
+    def _has_keywords(text: str, keywords: Tuple[str, ...], min_keywords: int) -> bool:
+        """Whether at least min_keywords of keywords occur in text (stops scanning once they do)"""
+        found = 0
+        for keyword in keywords:
+            if keyword in text:
+                found += 1
+                if found >= min_keywords:
+                    return True
+        return False
     
     async def run_comprehensive_test(self) -> Dict[str, Any]:
         """Run comprehensive test suite for Llama 4 Maverick"""
@@ -354,12 +453,26 @@ class Llama4MaverickTester:
             "summary": {}
         }
         
-        # Test all prompt types
-        for prompt_type in self.test_prompts.keys():
-            print(f"\n📝 Testing: {prompt_type}")
-            result = await self.test_prompt(prompt_type, max_tokens=800)
+        # Test all prompt types concurrently so vLLM batches them into a single decode pass.
+        # HuggingFaceProvider.generate blocks the event loop, so on that engine they still run one by one.
+        prompt_types = list(self.test_prompts)
+        print(f"\n📝 Testing: {', '.join(prompt_types)}")
+        outcomes = await asyncio.gather(
+            *(self.test_prompt(prompt_type, max_tokens=800) for prompt_type in prompt_types),
+            return_exceptions=True
+        )
+
+        for prompt_type, result in zip(prompt_types, outcomes):
+            if isinstance(result, Exception):
+                result = {
+                    "prompt_type": prompt_type,
+                    "model": self.model_name,
+                    "status": "error",
+                    "error": str(result),
+                    "duration": 0
+                }
             results["tests"][prompt_type] = result
-            
+
             if result["status"] == "success":
                 status_icon = "✅" if result["is_valid"] else "⚠️"
                 print(f"{status_icon} {prompt_type}: {result['duration']:.2f}s - {'Valid' if result['is_valid'] else 'Invalid'}")
@@ -384,7 +497,7 @@ class Llama4MaverickTester:
         return results
     
     async def cleanup(self):
-        """Clean up resources"""
+        """Clean up resources (a vLLM server keeps the model loaded; only the connection is closed)"""
         if self.provider:
             await self.provider.unload_model()
 
@@ -396,18 +509,21 @@ async def main():
     parser.add_argument("--prompt", choices=["enterprise_test_generation", "architectural_analysis", "complex_debugging"], 
                        help="Test specific prompt type")
     parser.add_argument("--comprehensive", action="store_true", help="Run comprehensive test suite")
+    parser.add_argument("--engine", choices=["vllm", "hf"], default="vllm",
+                       help="Inference engine: a running vLLM server (default) or in-process HuggingFace")
+    parser.add_argument("--vllm-url", default="http://localhost:8000/v1", help="vLLM server base URL")
     
     args = parser.parse_args()
     
-    tester = Llama4MaverickTester()
+    tester = Llama4MaverickTester(engine=args.engine, vllm_url=args.vllm_url)
     
     try:
         # Initialize provider
         if not await tester.initialize_provider():
             sys.exit(1)
         
-        # Load model
-        if not await tester.load_maverick_model():
+        # Connect to (or load) the model
+        if not await tester.connect_to_model():
             sys.exit(1)
         
         # Run tests
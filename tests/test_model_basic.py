@@ -4,13 +4,43 @@ Phase 1: Basic Model Functionality Test
 Tests models with deterministic prompts to verify basic functionality.
 """
 
-import requests
+import os
+import asyncio
+import httpx
 import json
 import time
+import random
 import sys
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
+
+# How long Ollama keeps a model loaded after a request, so concurrent and back-to-back
+# tests do not evict each other's weights
+OLLAMA_KEEP_ALIVE = "30m"
+
+# Ollama's own default for OLLAMA_MAX_LOADED_MODELS (per GPU); the suite tests at most this
+# many distinct models at once so they are not swapped in and out of memory mid-run
+DEFAULT_MAX_LOADED_MODELS = 3
+
+def _max_loaded_models() -> int:
+    """OLLAMA_MAX_LOADED_MODELS, or the default when unset, invalid or 0 (Ollama's "auto")"""
+    try:
+        value = int(os.getenv("OLLAMA_MAX_LOADED_MODELS", DEFAULT_MAX_LOADED_MODELS))
+    except ValueError:
+        return DEFAULT_MAX_LOADED_MODELS
+    return value if value > 0 else DEFAULT_MAX_LOADED_MODELS
 
 class BasicModelTester:
+    # Per prompt type: (keywords, min_keywords, min_length) a valid response must meet.
+    # Code answers must be substantial (over 30 chars), the general answer over 50 chars.
+    _VALIDATION: Dict[str, Tuple[Tuple[str, ...], int, int]] = {
+        "programming": (('function', 'return', 'add', 'number', 'javascript', '{', '}'), 3, 31),
+        "code_reasoning": (('array', 'map', 'function', 'doubled', 'console', 'log', 'multiply'), 2, 31),
+        "debugging": (('bug', 'error', 'factorial', 'infinite', 'recursion', 'missing', 'n-1'), 2, 31),
+        "algorithm": (('function', 'array', 'maximum', 'loop', 'for', 'if', 'return'), 3, 31),
+        "typescript": (('interface', 'user', 'string', 'number', 'optional', 'type'), 3, 31),
+        "general": (('bush', 'clinton', 'president', '2000', 'george', 'bill'), 2, 51),
+    }
+    
     def __init__(self, ollama_url: str = "http://localhost:11434"):
         self.ollama_url = ollama_url
         self.test_prompts = {
@@ -21,18 +51,50 @@ class BasicModelTester:
             "algorithm": "Write a function to find the maximum number in an array without using Math.max",
             "typescript": "Create a TypeScript interface for a User with name (string), age (number), and optional email (string)"
         }
+        self._programming_prompt_types = ("programming", "code_reasoning", "debugging", "algorithm", "typescript")
+        # Programming prompt chosen for each coder model, so it is picked once and stays stable
+        self._model_prompt_types: Dict[str, str] = {}
+        self._client: Optional[httpx.AsyncClient] = None
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """Keep-alive connection pool shared by every request to Ollama (close() releases it)"""
+        if self._client is None:
+            self._client = httpx.AsyncClient(limits=httpx.Limits(max_connections=32, keepalive_expiry=120))
+        return self._client
+    
+    async def close(self):
+        """Close the shared client's connections"""
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    async def list_models(self) -> List[str]:
+        """Names of the models available in Ollama"""
+        response = await self.client.get(f"{self.ollama_url}/api/tags")
+        response.raise_for_status()
+        return [model["name"] for model in response.json()["models"]]
+        
+    async def test_model(self, model_name: str, client: Optional[httpx.AsyncClient] = None) -> Dict[str, Any]:
+        """
+        Test a model with the appropriate prompt based on model type
+        
+        Args:
+            model_name: Ollama model to test
+            client: Client to send the request with (the shared client if omitted)
+        """
+        client = client or self.client
         
-    def test_model(self, model_name: str) -> Dict[str, Any]:
-        """Test a model with the appropriate prompt based on model type"""
         print(f"🧪 Testing model: {model_name}")
         
         # Choose prompt based on model type and add variety
         if "deepseek-coder" in model_name.lower():
             # Rotate through different programming prompts for variety
-            programming_prompts = ["programming", "code_reasoning", "debugging", "algorithm", "typescript"]
-            import random
-            random.seed(hash(model_name))  # Deterministic but varied
-            prompt_type = random.choice(programming_prompts)
+            prompt_type = self._model_prompt_types.get(model_name)
+            if prompt_type is None:
+                # Deterministic but varied; a private Random leaves the global generator alone
+                prompt_type = random.Random(hash(model_name)).choice(self._programming_prompt_types)
+                self._model_prompt_types[model_name] = prompt_type
             prompt = self.test_prompts[prompt_type]
         else:
             prompt = self.test_prompts["general"]
@@ -43,12 +105,13 @@ class BasicModelTester:
         start_time = time.time()
         
         try:
-            response = requests.post(
+            response = await client.post(
                 f"{self.ollama_url}/api/generate",
                 json={
                     "model": model_name,
                     "prompt": prompt,
                     "stream": False,
+                    "keep_alive": OLLAMA_KEEP_ALIVE,
                     "options": {
                         "temperature": 0.1,  # Deterministic
                         "num_predict": 200
@@ -94,49 +157,39 @@ class BasicModelTester:
     
     def _validate_response(self, response: str, prompt_type: str) -> bool:
         """Validate if response contains expected information based on prompt type"""
-        response_lower = response.lower()
-        
-        if prompt_type in ["programming", "code_reasoning", "debugging", "algorithm", "typescript"]:
-            # Check for programming-related keywords based on prompt type
-            if prompt_type == "programming":
-                keywords = ['function', 'return', 'add', 'number', 'javascript', '{', '}']
-                min_keywords = 3
-            elif prompt_type == "code_reasoning":
-                keywords = ['array', 'map', 'function', 'doubled', 'console', 'log', 'multiply']
-                min_keywords = 2
-            elif prompt_type == "debugging":
-                keywords = ['bug', 'error', 'factorial', 'infinite', 'recursion', 'missing', 'n-1']
-                min_keywords = 2
-            elif prompt_type == "algorithm":
-                keywords = ['function', 'array', 'maximum', 'loop', 'for', 'if', 'return']
-                min_keywords = 3
-            elif prompt_type == "typescript":
-                keywords = ['interface', 'user', 'string', 'number', 'optional', 'type']
-                min_keywords = 3
-            
-            found_keywords = sum(1 for keyword in keywords if keyword in response_lower)
-            # Should contain relevant keywords and be substantial
-            return len(response) > 30 and found_keywords >= min_keywords
-        else:
-            # Check for historical keywords
-            keywords = ['bush', 'clinton', 'president', '2000', 'george', 'bill']
-            found_keywords = sum(1 for keyword in keywords if keyword in response_lower)
-            # Response should be substantial and contain relevant information
-            return len(response) > 50 and found_keywords >= 2
+        # Prompt types without their own entry are checked like the general prompt
+        keywords, min_keywords, min_length = self._VALIDATION.get(prompt_type, self._VALIDATION["general"])
+        if len(response) < min_length:
+            return False
+        return self._has_keywords(response.lower(), keywords, min_keywords)
     
-    def run_test_suite(self, models: list) -> Dict[str, Any]:
-        """Run tests on multiple models"""
-        results = {}
+    @staticmethod
+    def _has_keywords(text: str, keywords: Tuple[str, ...], min_keywords: int) -> bool:
+        """Whether at least min_keywords of keywords occur in text (stops scanning once they do)"""
+        found = 0
+        for keyword in keywords:
+            if keyword in text:
+                found += 1
+                if found >= min_keywords:
+                    return True
+        return False
+    
+    async def run_test_suite(self, models: list) -> Dict[str, Any]:
+        """
+        Run tests on multiple models
         
+        Requests go out concurrently over the shared client, so Ollama can batch
+        the requests for a model and serve models it keeps loaded side by side.
+        At most OLLAMA_MAX_LOADED_MODELS distinct models are tested at once.
+        """
         print("🚀 Starting Phase 1: Basic Model Functionality Tests")
         print("📝 Using model-specific prompts:")
         print(f"   General: '{self.test_prompts['general']}'")
         print(f"   Programming: '{self.test_prompts['programming']}'")
         print("=" * 60)
         
-        for model in models:
-            result = self.test_model(model)
-            results[model] = result
+        async def test_and_report(model: str) -> Dict[str, Any]:
+            result = await self.test_model(model)
             
             # Print immediate results
             if result["status"] == "success":
@@ -144,10 +197,20 @@ class BasicModelTester:
                 print(f"{status_icon} {model}: {result['duration']:.2f}s - {'Valid' if result['is_valid'] else 'Invalid'}")
             else:
                 print(f"❌ {model}: {result['error']}")
+            return result
+        
+        loaded_models = asyncio.Semaphore(_max_loaded_models())
+        
+        async def test_when_loadable(model: str) -> Dict[str, Any]:
+            async with loaded_models:
+                return await test_and_report(model)
         
-        return results
+        distinct_models = list(dict.fromkeys(models))
+        results = await asyncio.gather(*(test_when_loadable(model) for model in distinct_models))
+        return dict(zip(distinct_models, results))
 
-if __name__ == "__main__":
+async def main():
+    """Main test execution"""
     import argparse
     
     parser = argparse.ArgumentParser(description="Phase 1: Basic Model Functionality Test")
@@ -158,23 +221,26 @@ if __name__ == "__main__":
     
     tester = BasicModelTester()
     
-    if args.model:
-        result = tester.test_model(args.model)
-        print(json.dumps(result, indent=2))
-    elif args.all:
-        # Get available models
-        try:
-            response = requests.get(f"{tester.ollama_url}/api/tags")
-            if response.status_code == 200:
-                models = [model["name"] for model in response.json()["models"]]
-                results = tester.run_test_suite(models)
-                print("\n📊 Final Results:")
-                print(json.dumps(results, indent=2))
-            else:
-                print("❌ Could not fetch available models")
-        except Exception as e:
-            print(f"❌ Error: {e}")
-    else:
-        # Default test with known models
-        default_models = ["deepseek-coder:6.7b", "llama3.2:1b"]
-        results = tester.run_test_suite(default_models) 
\ No newline at end of file
+    try:
+        if args.model:
+            result = await tester.test_model(args.model)
+            print(json.dumps(result, indent=2))
+        elif args.all:
+            # Get available models
+            try:
+                models = await tester.list_models()
+            except Exception as e:
+                print(f"❌ Could not fetch available models: {e}")
+                return
+            results = await tester.run_test_suite(models)
+            print("\n📊 Final Results:")
+            print(json.dumps(results, indent=2))
+        else:
+            # Default test with known models
+            default_models = ["deepseek-coder:6.7b", "llama3.2:1b"]
+            results = await tester.run_test_suite(default_models)
+    finally:
+        await tester.close()
+
+if __name__ == "__main__":
+    asyncio.run(main())